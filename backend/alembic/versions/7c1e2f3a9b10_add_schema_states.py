@@ -0,0 +1,38 @@
+"""Add schema_states
+
+Revision ID: 7c1e2f3a9b10
+Revises: 5a4b1818906b
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e2f3a9b10'
+down_revision: Union[str, Sequence[str], None] = '5a4b1818906b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'schema_states',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('source_id', sa.String(), nullable=False),
+        sa.Column('fields_json', sa.JSON(), nullable=False),
+        sa.Column('doc_count', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_schema_states_source_id'), 'schema_states', ['source_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_schema_states_source_id'), table_name='schema_states')
+    op.drop_table('schema_states')
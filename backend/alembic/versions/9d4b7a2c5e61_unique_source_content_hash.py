@@ -0,0 +1,65 @@
+"""Unique (source_id, content_hash) on uploaded_files
+
+Revision ID: 9d4b7a2c5e61
+Revises: 7c1e2f3a9b10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4b7a2c5e61'
+down_revision: Union[str, Sequence[str], None] = '7c1e2f3a9b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Uploads racing before the index existed may have stored the same
+    # content twice for a source. Keep the oldest row of each pair and
+    # move the fragments of the others onto it. Their Mongo records keep
+    # the old file_id tag but are still found by fragment and source.
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE uploaded_file_dupes AS
+        SELECT id, keep_id FROM (
+            SELECT id,
+                   first_value(id) OVER w AS keep_id,
+                   row_number() OVER w AS n
+            FROM uploaded_files
+            WHERE source_id IS NOT NULL AND content_hash IS NOT NULL
+            WINDOW w AS (
+                PARTITION BY source_id, content_hash ORDER BY created_at, id
+            )
+        ) ranked
+        WHERE n > 1
+        """
+    )
+    op.execute(
+        """
+        UPDATE parsed_fragments AS f
+        SET file_id = d.keep_id
+        FROM uploaded_file_dupes AS d
+        WHERE f.file_id = d.id
+        """
+    )
+    op.execute(
+        "DELETE FROM uploaded_files WHERE id IN (SELECT id FROM uploaded_file_dupes)"
+    )
+    op.drop_table('uploaded_file_dupes')
+    op.create_index(
+        'uq_uploaded_files_source_hash',
+        'uploaded_files',
+        ['source_id', 'content_hash'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_uploaded_files_source_hash', table_name='uploaded_files')
@@ -0,0 +1,82 @@
+"""Per-source rollup table, backfilled from existing uploads
+
+Revision ID: a4d6e8f0b2c7
+Revises: f3c7a1e9d5b2
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d6e8f0b2c7'
+down_revision: Union[str, Sequence[str], None] = 'f3c7a1e9d5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sources',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('source_id', sa.String(), nullable=False),
+        sa.Column('file_count', sa.BigInteger(), nullable=False),
+        sa.Column('total_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('fragment_counts', sa.JSON(), nullable=False),
+        sa.Column('last_upload_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('latest_schema_version', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_sources_source_id'), 'sources', ['source_id'], unique=True)
+
+    op.execute(
+        """
+        INSERT INTO sources (
+            id, source_id, file_count, total_bytes, fragment_counts,
+            last_upload_at, latest_schema_version
+        )
+        WITH files AS (
+            SELECT source_id,
+                   count(*) AS file_count,
+                   coalesce(sum(size_bytes), 0) AS total_bytes,
+                   max(created_at) AS last_upload_at
+            FROM uploaded_files
+            WHERE source_id IS NOT NULL
+            GROUP BY source_id
+        ),
+        fragments AS (
+            SELECT source_id, json_object_agg(fragment_type, n) AS fragment_counts
+            FROM (
+                SELECT u.source_id, p.fragment_type, count(*) AS n
+                FROM parsed_fragments p
+                JOIN uploaded_files u ON u.id = p.file_id
+                WHERE u.source_id IS NOT NULL
+                GROUP BY u.source_id, p.fragment_type
+            ) per_type
+            GROUP BY source_id
+        ),
+        versions AS (
+            SELECT source_id, max(version) AS latest_schema_version
+            FROM schema_versions
+            GROUP BY source_id
+        )
+        SELECT gen_random_uuid()::text, f.source_id, f.file_count, f.total_bytes,
+               coalesce(g.fragment_counts, '{}'::json), f.last_upload_at,
+               v.latest_schema_version
+        FROM files f
+        LEFT JOIN fragments g ON g.source_id = f.source_id
+        LEFT JOIN versions v ON v.source_id = f.source_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_sources_source_id'), table_name='sources')
+    op.drop_table('sources')
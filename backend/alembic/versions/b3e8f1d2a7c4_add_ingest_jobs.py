@@ -0,0 +1,52 @@
+"""Add ingest_jobs table
+
+Revision ID: b3e8f1d2a7c4
+Revises: 9d4b7a2c5e61
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8f1d2a7c4'
+down_revision: Union[str, Sequence[str], None] = '9d4b7a2c5e61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ingest_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('source_id', sa.String(), nullable=True),
+        sa.Column('filename', sa.String(), nullable=True),
+        sa.Column('content_type', sa.String(), nullable=True),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('content_hash', sa.String(), nullable=False),
+        sa.Column('payload_path', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('result_json', sa.JSON(), nullable=True),
+        sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('extracted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_ingest_jobs_source_id'), 'ingest_jobs', ['source_id'], unique=False)
+    op.create_index('ix_ingest_jobs_status_run_after', 'ingest_jobs', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ingest_jobs_status_run_after', table_name='ingest_jobs')
+    op.drop_index(op.f('ix_ingest_jobs_source_id'), table_name='ingest_jobs')
+    op.drop_table('ingest_jobs')
@@ -0,0 +1,40 @@
+"""Widen uploaded_files.size_bytes to bigint
+
+Revision ID: b6d2f8a4c1e9
+Revises: a4d6e8f0b2c7
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d2f8a4c1e9'
+down_revision: Union[str, Sequence[str], None] = 'a4d6e8f0b2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'uploaded_files',
+        'size_bytes',
+        existing_type=sa.Integer(),
+        type_=sa.BigInteger(),
+        existing_nullable=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'uploaded_files',
+        'size_bytes',
+        existing_type=sa.BigInteger(),
+        type_=sa.Integer(),
+        existing_nullable=True,
+    )
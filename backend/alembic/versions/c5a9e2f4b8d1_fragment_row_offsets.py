@@ -0,0 +1,34 @@
+"""Row offsets and 64-bit byte offsets on parsed_fragments
+
+Revision ID: c5a9e2f4b8d1
+Revises: b3e8f1d2a7c4
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a9e2f4b8d1'
+down_revision: Union[str, Sequence[str], None] = 'b3e8f1d2a7c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('parsed_fragments', 'start_offset', type_=sa.BigInteger(), existing_nullable=True)
+    op.alter_column('parsed_fragments', 'end_offset', type_=sa.BigInteger(), existing_nullable=True)
+    op.add_column('parsed_fragments', sa.Column('start_row', sa.BigInteger(), nullable=True))
+    op.add_column('parsed_fragments', sa.Column('end_row', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('parsed_fragments', 'end_row')
+    op.drop_column('parsed_fragments', 'start_row')
+    op.alter_column('parsed_fragments', 'end_offset', type_=sa.Integer(), existing_nullable=True)
+    op.alter_column('parsed_fragments', 'start_offset', type_=sa.Integer(), existing_nullable=True)
@@ -0,0 +1,35 @@
+"""Drop the unused schema_versions fingerprint index
+
+Revision ID: c8e4a2f6d0b3
+Revises: b6d2f8a4c1e9
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e4a2f6d0b3'
+down_revision: Union[str, Sequence[str], None] = 'b6d2f8a4c1e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fingerprints are only ever compared with the latest version, which
+    # is found by source_id and version.
+    op.drop_index('ix_schema_versions_source_fingerprint', table_name='schema_versions')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'ix_schema_versions_source_fingerprint',
+        'schema_versions',
+        ['source_id', 'fingerprint'],
+        unique=False,
+    )
@@ -0,0 +1,30 @@
+"""Add start_page/end_page to parsed_fragments
+
+Revision ID: d2f6b8e0a4c7
+Revises: c8e4a2f6d0b3
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6b8e0a4c7'
+down_revision: Union[str, Sequence[str], None] = 'c8e4a2f6d0b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('parsed_fragments', sa.Column('start_page', sa.Integer(), nullable=True))
+    op.add_column('parsed_fragments', sa.Column('end_page', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('parsed_fragments', 'end_page')
+    op.drop_column('parsed_fragments', 'start_page')
@@ -0,0 +1,30 @@
+"""Reset schema_states for the column type vocabulary
+
+Revision ID: d7f1c3b9e2a6
+Revises: c5a9e2f4b8d1
+Create Date: 2026-10-18 13:00:00.000000
+
+Running states counted number/string types. Dropping them makes the next
+incremental inference of each source reseed its state from a full scan
+with the integer/float/date/... types.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f1c3b9e2a6'
+down_revision: Union[str, Sequence[str], None] = 'c5a9e2f4b8d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DELETE FROM schema_states")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM schema_states")
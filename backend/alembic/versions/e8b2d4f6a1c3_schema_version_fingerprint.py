@@ -0,0 +1,37 @@
+"""Fingerprint column on schema_versions
+
+Revision ID: e8b2d4f6a1c3
+Revises: d7f1c3b9e2a6
+Create Date: 2026-10-18 14:00:00.000000
+
+Existing rows keep a null fingerprint; inference fills in the latest
+version's on its next run.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b2d4f6a1c3'
+down_revision: Union[str, Sequence[str], None] = 'd7f1c3b9e2a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('schema_versions', sa.Column('fingerprint', sa.String(length=32), nullable=True))
+    op.create_index(
+        'ix_schema_versions_source_fingerprint',
+        'schema_versions',
+        ['source_id', 'fingerprint'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_schema_versions_source_fingerprint', table_name='schema_versions')
+    op.drop_column('schema_versions', 'fingerprint')
@@ -0,0 +1,43 @@
+"""Composite indexes for keyset pagination of files and fragments
+
+Revision ID: f3c7a1e9d5b2
+Revises: e8b2d4f6a1c3
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c7a1e9d5b2'
+down_revision: Union[str, Sequence[str], None] = 'e8b2d4f6a1c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_uploaded_files_created_at_id',
+        'uploaded_files',
+        ['created_at', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_parsed_fragments_file_type_id',
+        'parsed_fragments',
+        ['file_id', 'fragment_type', 'id'],
+        unique=False,
+    )
+    # Covered by the leading column of the composite index.
+    op.drop_index(op.f('ix_parsed_fragments_file_id'), table_name='parsed_fragments')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_parsed_fragments_file_id'), 'parsed_fragments', ['file_id'], unique=False)
+    op.drop_index('ix_parsed_fragments_file_type_id', table_name='parsed_fragments')
+    op.drop_index('ix_uploaded_files_created_at_id', table_name='uploaded_files')
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.profiler import ProfileStore, StackSampler, check_profiling_access
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def sample_process(
+    seconds: float = Query(10, gt=0),
+    interval_ms: Optional[float] = Query(None, gt=0),
+    x_profiling_token: Optional[str] = Header(None),
+):
+    """
+    Sample every thread of the worker serving this request for `seconds`
+    and return the collapsed stacks. The profile is also stored; its id
+    is in the X-Profile-Id header.
+    """
+    check_profiling_access(x_profiling_token)
+    seconds = min(seconds, settings.PROFILING_MAX_SECONDS)
+    sampler = StackSampler((interval_ms or settings.PROFILING_INTERVAL_MS) / 1000).start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+    profile_id = ProfileStore.save(sampler)
+    return PlainTextResponse(sampler.collapsed(), headers={"X-Profile-Id": profile_id})
+
+
+@router.get("/profiles")
+async def list_profiles(x_profiling_token: Optional[str] = Header(None)):
+    check_profiling_access(x_profiling_token)
+    return ProfileStore.list()
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_profiling_token: Optional[str] = Header(None)):
+    check_profiling_access(x_profiling_token)
+    collapsed = ProfileStore.read(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(collapsed)
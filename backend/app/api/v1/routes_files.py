@@ -1,41 +1,99 @@
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, tuple_
 
 from app.core.database import get_db
+from app.core.responses import OrjsonResponse, ndjson_response
 from app.models.uploaded_file import UploadedFile
 from app.models.parsed_fragment import ParsedFragment
+from app.models.source import Source
+from app.services.pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    decode_timestamp,
+    encode_cursor,
+)
 
 router = APIRouter(tags=["files"])
 
+RESPONSE_FORMATS = "^(json|ndjson)$"
+
+
+def _file_dict(r: Any) -> Dict[str, Any]:
+    return {
+        "id": r.id,
+        "source_id": r.source_id,
+        "filename": r.filename,
+        "content_type": r.content_type,
+        "size_bytes": r.size_bytes,
+        "created_at": r.created_at,
+    }
+
+
+def _fragment_dict(r: Any, include_preview: bool) -> Dict[str, Any]:
+    fragment = {
+        "id": r.id,
+        "file_id": r.file_id,
+        "fragment_type": r.fragment_type,
+        "start_offset": r.start_offset,
+        "end_offset": r.end_offset,
+        "record_count": r.record_count,
+        "start_row": r.start_row,
+        "end_row": r.end_row,
+        "start_page": r.start_page,
+        "end_page": r.end_page,
+    }
+    if include_preview:
+        fragment["preview_json"] = r.preview_json
+    return fragment
+
 
 @router.get("/files")
 async def list_files(
     session: AsyncSession = Depends(get_db),
     limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    offset: int = Query(0, ge=0, deprecated=True),
+    format: str = Query("json", pattern=RESPONSE_FORMATS),
 ):
-    stmt = (
-        select(UploadedFile)
-        .order_by(UploadedFile.created_at.desc())
-        .limit(limit)
-        .offset(offset)
-    )
-    result = await session.execute(stmt)
-    rows: List[UploadedFile] = result.scalars().all()
-
-    return [
-        {
-            "id": r.id,
-            "source_id": r.source_id,
-            "filename": r.filename,
-            "content_type": r.content_type,
-            "size_bytes": r.size_bytes,
-            "created_at": r.created_at,
-        }
-        for r in rows
-    ]
+    """
+    Newest first, keyset-paginated on (created_at, id): pass the
+    X-Next-Cursor header of one page as `cursor` to get the next.
+    format=ndjson streams every file from the cursor on, ignoring limit.
+    """
+    stmt = select(
+        UploadedFile.id,
+        UploadedFile.source_id,
+        UploadedFile.filename,
+        UploadedFile.content_type,
+        UploadedFile.size_bytes,
+        UploadedFile.created_at,
+    ).order_by(UploadedFile.created_at.desc(), UploadedFile.id.desc())
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor, 2)
+            created_at = decode_timestamp(created_at)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        stmt = stmt.where(
+            tuple_(UploadedFile.created_at, UploadedFile.id) < tuple_(created_at, last_id)
+        )
+    elif offset:
+        stmt = stmt.offset(offset)
+
+    if format == "ndjson":
+        return ndjson_response(stmt, _file_dict)
+
+    result = await session.execute(stmt.limit(limit))
+    rows = result.all()
+
+    headers = {}
+    if len(rows) == limit:
+        last = rows[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor([last.created_at.isoformat(), last.id])
+
+    return OrjsonResponse([_file_dict(r) for r in rows], headers=headers)
 
 
 @router.get("/files/{file_id}/fragments")
@@ -43,56 +101,91 @@ async def list_fragments_for_file(
     file_id: str,
     session: AsyncSession = Depends(get_db),
     fragment_type: Optional[str] = Query(None),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = Query(None),
+    include_preview: bool = Query(True),
+    format: str = Query("json", pattern=RESPONSE_FORMATS),
 ):
-    stmt = select(ParsedFragment).where(ParsedFragment.file_id == file_id)
+    """
+    Ordered by (fragment_type, id) and keyset-paginated the same way as
+    /files. include_preview=false leaves preview_json out of the query.
+    """
+    columns = [
+        ParsedFragment.id,
+        ParsedFragment.file_id,
+        ParsedFragment.fragment_type,
+        ParsedFragment.start_offset,
+        ParsedFragment.end_offset,
+        ParsedFragment.record_count,
+        ParsedFragment.start_row,
+        ParsedFragment.end_row,
+        ParsedFragment.start_page,
+        ParsedFragment.end_page,
+    ]
+    if include_preview:
+        columns.append(ParsedFragment.preview_json)
+
+    stmt = select(*columns).where(ParsedFragment.file_id == file_id)
     if fragment_type:
         stmt = stmt.where(ParsedFragment.fragment_type == fragment_type)
+    if cursor:
+        try:
+            last_type, last_id = decode_cursor(cursor, 2)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        stmt = stmt.where(
+            tuple_(ParsedFragment.fragment_type, ParsedFragment.id) > tuple_(last_type, last_id)
+        )
     stmt = stmt.order_by(ParsedFragment.fragment_type, ParsedFragment.id)
 
-    result = await session.execute(stmt)
-    rows: List[ParsedFragment] = result.scalars().all()
+    rows: List[Any] = []
+    if format == "json":
+        result = await session.execute(stmt.limit(limit))
+        rows = result.all()
 
-    if not rows:
-        stmt_file = select(UploadedFile).where(UploadedFile.id == file_id)
+    if not rows and not cursor:
+        stmt_file = select(UploadedFile.id).where(UploadedFile.id == file_id)
         result_file = await session.execute(stmt_file)
-        file_row = result_file.scalars().first()
-        if not file_row:
+        if result_file.first() is None:
             raise HTTPException(status_code=404, detail="File not found")
 
-    return [
-        {
-            "id": r.id,
-            "file_id": r.file_id,
-            "fragment_type": r.fragment_type,
-            "start_offset": r.start_offset,
-            "end_offset": r.end_offset,
-            "record_count": r.record_count,
-            "preview_json": r.preview_json,
-        }
-        for r in rows
-    ]
+    if format == "ndjson":
+        return ndjson_response(stmt, lambda r: _fragment_dict(r, include_preview))
+
+    headers = {}
+    if len(rows) == limit:
+        last = rows[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor([last.fragment_type, last.id])
+
+    return OrjsonResponse([_fragment_dict(r, include_preview) for r in rows], headers=headers)
 
 
 @router.get("/sources")
 async def list_sources(
     session: AsyncSession = Depends(get_db),
 ):
-    stmt = (
-        select(
-            UploadedFile.source_id,
-            func.count(UploadedFile.id),
-        )
-        .where(UploadedFile.source_id.is_not(None))
-        .group_by(UploadedFile.source_id)
-        .order_by(UploadedFile.source_id)
-    )
+    # Reads the rollup maintained at ingest time; no scan of uploaded_files.
+    stmt = select(
+        Source.source_id,
+        Source.file_count,
+        Source.total_bytes,
+        Source.fragment_counts,
+        Source.last_upload_at,
+        Source.latest_schema_version,
+    ).order_by(Source.source_id)
     result = await session.execute(stmt)
     rows = result.all()
 
-    return [
-        {
-            "source_id": r[0],
-            "file_count": r[1],
-        }
-        for r in rows
-    ]
+    return OrjsonResponse(
+        [
+            {
+                "source_id": r.source_id,
+                "file_count": r.file_count,
+                "total_bytes": r.total_bytes,
+                "fragment_counts": r.fragment_counts,
+                "last_upload_at": r.last_upload_at,
+                "latest_schema_version": r.latest_schema_version,
+            }
+            for r in rows
+        ]
+    )
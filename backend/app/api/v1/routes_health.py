@@ -1,7 +1,19 @@
 from fastapi import APIRouter
 
+from app.core.database import engine
+from app.core.pool_metrics import mongo_pool_listener, postgres_pool_stats
+
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@router.get("/health/pools")
+async def pool_stats():
+    # Counts are for this worker process only.
+    return {
+        "postgres": postgres_pool_stats(engine.pool),
+        "mongo": mongo_pool_listener.stats(),
+    }
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.services.job_queue import JobQueue
+
+router = APIRouter(tags=["jobs"])
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, session: AsyncSession = Depends(get_db)):
+    job = await JobQueue.get(session, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobQueue.to_dict(job)
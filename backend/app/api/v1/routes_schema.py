@@ -1,29 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 
 from app.core.database import get_db
+from app.core.profiler import profile_request
 from app.models.schema_version import SchemaVersion
 from app.services.schema_inference import SchemaInferenceService
+from app.services.schema_cache import encode_body, etag_matches, get_schema_cache, make_etag
 from app.services.schema_diff import SchemaDiffService
 
 router = APIRouter(tags=["schema"])
 
 
+async def _cached_response(
+    source_id: str,
+    endpoint: str,
+    if_none_match: Optional[str],
+    load: Callable[[], Awaitable[Any]],
+) -> Response:
+    cache = get_schema_cache()
+    cached = cache.get(source_id, endpoint) if cache is not None else None
+    if cached is not None:
+        etag, body = cached
+    else:
+        generation = cache.generation(source_id) if cache is not None else 0
+        body = encode_body(await load())
+        etag = make_etag(body)
+        if cache is not None:
+            cache.put(source_id, endpoint, generation, etag, body)
+
+    # no-cache: clients may keep the response but must revalidate it.
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.post("/schema/infer/{source_id}")
 async def infer_schema_for_source(
     source_id: str,
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    sampling: str = Query("incremental"),
+    budget: Optional[int] = Query(None, ge=1),
+    per_file: Optional[int] = Query(None, ge=1),
+    patience: Optional[int] = Query(None, ge=1),
 ):
     try:
-        schema_row = await SchemaInferenceService.infer_for_source(session, source_id)
+        async with profile_request(request) as profile:
+            schema_row, report = await SchemaInferenceService.infer_for_source(
+                session,
+                source_id,
+                sampling=sampling,
+                budget=budget,
+                per_file=per_file,
+                patience=patience,
+            )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if profile.id:
+        response.headers["X-Profile-Id"] = profile.id
     return {
         "source_id": schema_row.source_id,
         "version": schema_row.version,
         "schema": schema_row.schema_json,
+        "fingerprint": schema_row.fingerprint,
         "created_at": schema_row.created_at,
+        "sampling": report,
     }
 
 
@@ -31,44 +76,74 @@ async def infer_schema_for_source(
 async def get_latest_schema(
     source_id: str,
     session: AsyncSession = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
 ):
-    stmt = (
-        select(SchemaVersion)
-        .where(SchemaVersion.source_id == source_id)
-        .order_by(desc(SchemaVersion.version))
-    )
-    result = await session.execute(stmt)
-    row = result.scalars().first()
-    if not row:
-        raise HTTPException(status_code=404, detail="No schema for this source_id")
-    return {
-        "source_id": row.source_id,
-        "version": row.version,
-        "schema": row.schema_json,
-        "created_at": row.created_at,
-    }
+    async def load():
+        stmt = (
+            select(
+                SchemaVersion.source_id,
+                SchemaVersion.version,
+                SchemaVersion.schema_json,
+                SchemaVersion.fingerprint,
+                SchemaVersion.created_at,
+            )
+            .where(SchemaVersion.source_id == source_id)
+            .order_by(desc(SchemaVersion.version))
+            .limit(1)
+        )
+        result = await session.execute(stmt)
+        row = result.first()
+        if not row:
+            raise HTTPException(status_code=404, detail="No schema for this source_id")
+        return {
+            "source_id": row.source_id,
+            "version": row.version,
+            "schema": row.schema_json,
+            "fingerprint": row.fingerprint,
+            "created_at": row.created_at,
+        }
+
+    return await _cached_response(source_id, "latest", if_none_match, load)
 
 
 @router.get("/schema/{source_id}/versions")
 async def list_schema_versions(
     source_id: str,
     session: AsyncSession = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
 ):
-    stmt = (
-        select(SchemaVersion)
-        .where(SchemaVersion.source_id == source_id)
-        .order_by(SchemaVersion.version)
-    )
-    result = await session.execute(stmt)
-    rows = result.scalars().all()
-    return [
-        {
-            "source_id": r.source_id,
-            "version": r.version,
-            "created_at": r.created_at,
-        }
-        for r in rows
-    ]
+    async def load():
+        stmt = (
+            select(
+                SchemaVersion.source_id,
+                SchemaVersion.version,
+                SchemaVersion.fingerprint,
+                SchemaVersion.created_at,
+            )
+            .where(SchemaVersion.source_id == source_id)
+            .order_by(SchemaVersion.version)
+        )
+        result = await session.execute(stmt)
+        rows = result.all()
+        return [
+            {
+                "source_id": r.source_id,
+                "version": r.version,
+                "fingerprint": r.fingerprint,
+                "created_at": r.created_at,
+            }
+            for r in rows
+        ]
+
+    return await _cached_response(source_id, "versions", if_none_match, load)
+
+
+@router.get("/schema/cache-stats")
+async def schema_cache_stats():
+    cache = get_schema_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
 
 
 @router.get("/schema/compare/{source_id}")
@@ -78,38 +153,43 @@ async def compare_schema_versions(
     v2: int,
     session: AsyncSession = Depends(get_db),
 ):
-    stmt_v1 = (
-        select(SchemaVersion)
+    # Fingerprints first; schema_json is only read when they differ.
+    stmt = (
+        select(SchemaVersion.version, SchemaVersion.fingerprint)
         .where(
             SchemaVersion.source_id == source_id,
-            SchemaVersion.version == v1,
+            SchemaVersion.version.in_([v1, v2]),
         )
-        .limit(1)
     )
-    stmt_v2 = (
-        select(SchemaVersion)
+    fingerprints = {r.version: r.fingerprint for r in (await session.execute(stmt)).all()}
+    if v1 not in fingerprints:
+        raise HTTPException(status_code=404, detail="Version v1 not found")
+    if v2 not in fingerprints:
+        raise HTTPException(status_code=404, detail="Version v2 not found")
+
+    if fingerprints[v1] is not None and fingerprints[v1] == fingerprints[v2]:
+        return {
+            "source_id": source_id,
+            "v1": v1,
+            "v2": v2,
+            "identical": True,
+            "diff": {"added_fields": [], "removed_fields": [], "changed_fields": {}},
+        }
+
+    stmt = (
+        select(SchemaVersion.version, SchemaVersion.schema_json)
         .where(
             SchemaVersion.source_id == source_id,
-            SchemaVersion.version == v2,
+            SchemaVersion.version.in_([v1, v2]),
         )
-        .limit(1)
     )
-
-    result_v1 = await session.execute(stmt_v1)
-    row_v1 = result_v1.scalars().first()
-    if not row_v1:
-        raise HTTPException(status_code=404, detail="Version v1 not found")
-
-    result_v2 = await session.execute(stmt_v2)
-    row_v2 = result_v2.scalars().first()
-    if not row_v2:
-        raise HTTPException(status_code=404, detail="Version v2 not found")
-
-    diff = SchemaDiffService.diff(row_v1.schema_json, row_v2.schema_json)
+    schemas = {r.version: r.schema_json for r in (await session.execute(stmt)).all()}
+    diff = SchemaDiffService.diff(schemas[v1], schemas[v2])
 
     return {
         "source_id": source_id,
         "v1": v1,
         "v2": v2,
+        "identical": not (diff["added_fields"] or diff["removed_fields"] or diff["changed_fields"]),
         "diff": diff,
     }
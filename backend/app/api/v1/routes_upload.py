@@ -1,60 +1,86 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends
-from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.profiler import profile_request
+from app.services.batch_ingest import BatchIngestService
+from app.services.dedup_cache import get_dedup_cache
 from app.services.file_service import FileService
-from app.services.fragment_extractor import FragmentExtractor
-from app.services.fragment_saver import FragmentSaver
+from app.services.ingest_service import IngestService
+from app.services.job_queue import JobQueue
 
 router = APIRouter(tags=["upload"])
 
+INGEST_MODES = ("sync", "async")
+
 
 @router.post("/upload")
 async def upload_file(
+    request: Request,
+    response: Response,
     source_id: Optional[str] = Form(None),
     file: UploadFile = File(...),
     metadata: Optional[str] = Form(None),
+    mode: Optional[str] = Query(None, description="sync (default) or async"),
     session: AsyncSession = Depends(get_db),
 ):
-    file_bytes = await file.read()
-    content_hash = await FileService.compute_hash(file_bytes)
-    extracted_text = await FileService.extract_text(file, file_bytes)
-
-    uploaded_file = await FileService.save_file_record(
-        session=session,
-        source_id=source_id,
-        file=file,
-        content_hash=content_hash,
-        text_excerpt=extracted_text,
-        size_bytes=len(file_bytes),
+    mode = mode or settings.INGEST_DEFAULT_MODE
+    if mode not in INGEST_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown ingest mode: {mode}")
+
+    # Async uploads are spooled next to the job payloads, so enqueueing
+    # them is a rename rather than a copy onto the payload volume.
+    spooled = await FileService.spool_upload(
+        file, spool_dir=settings.INGEST_PAYLOAD_DIR if mode == "async" else None
     )
 
-    json_blocks = FragmentExtractor.extract_json_blocks(extracted_text)
-    csv_blocks = FragmentExtractor.extract_csv_blocks(extracted_text)
-    kv_blocks = FragmentExtractor.extract_kv_blocks(extracted_text)
-    html_tables = FragmentExtractor.extract_html_tables(extracted_text)
-    text_block = FragmentExtractor.extract_text_block(extracted_text)
-
-    await FragmentSaver.save_json_fragments(session, uploaded_file.id, json_blocks)
-    await FragmentSaver.save_csv_blocks(session, uploaded_file.id, csv_blocks)
-    await FragmentSaver.save_html_tables(session, uploaded_file.id, html_tables)
-    await FragmentSaver.save_kv_blocks(session, uploaded_file.id, kv_blocks)
-    if text_block:
-        await FragmentSaver.save_text_block(session, uploaded_file.id, text_block)
-
-    return {
-        "status": "ok",
-        "source_id": source_id,
-        "file_id": uploaded_file.id,
-        "filename": file.filename,
-        "content_hash": content_hash,
-        "raw_text_length": len(extracted_text),
-        "fragments": {
-            "json_blocks": len(json_blocks),
-            "csv_blocks": len(csv_blocks),
-            "kv_blocks": len(kv_blocks),
-            "html_tables": len(html_tables),
-            "text_block": bool(text_block),
-        },
-    }
+    if mode == "async":
+        job = await JobQueue.enqueue(session, spooled, source_id)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "status": "queued",
+                "job_id": job.id,
+                "source_id": source_id,
+                "filename": spooled.filename,
+                "content_hash": spooled.content_hash,
+                "status_url": f"{settings.API_V1_PREFIX}/jobs/{job.id}",
+            },
+        )
+
+    try:
+        duplicate = await IngestService.find_duplicate(session, spooled, source_id)
+        if duplicate is not None:
+            return duplicate
+        async with profile_request(request) as profile:
+            extraction = await IngestService.extract(spooled)
+            result = await IngestService.persist(session, spooled, source_id, extraction)
+    finally:
+        spooled.cleanup()
+    if profile.id:
+        response.headers["X-Profile-Id"] = profile.id
+    return result
+
+
+@router.post("/upload/batch")
+async def upload_batch(
+    source_id: Optional[str] = Form(None),
+    files: List[UploadFile] = File(..., description="Files and/or zip/tar(.gz) archives"),
+    concurrency: Optional[int] = Query(None, ge=1),
+    commit_size: Optional[int] = Query(None, ge=1),
+    session: AsyncSession = Depends(get_db),
+):
+    return await BatchIngestService.ingest(
+        session, files, source_id, concurrency=concurrency, commit_size=commit_size
+    )
+
+
+@router.get("/upload/dedup-stats")
+async def dedup_stats():
+    cache = get_dedup_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
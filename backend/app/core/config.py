@@ -1,4 +1,11 @@
 import os
+import tempfile
+from typing import Optional
+
+
+def _optional_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
 
 
 class Settings:
@@ -11,8 +18,125 @@ class Settings:
     POSTGRES_HOST = os.getenv("POSTGRES_HOST", "etl_postgres")
     POSTGRES_PORT = int(os.getenv("POSTGRES_PORT", "5432"))
 
+    # SQLAlchemy pool for the API and workers, per process. Recycle below
+    # the idle timeout of any proxy in front of Postgres; pre-ping catches
+    # connections dropped anyway. Set the statement cache to 0 behind
+    # PgBouncer in transaction mode.
+    POSTGRES_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "10"))
+    POSTGRES_MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW", "20"))
+    POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "30"))
+    POSTGRES_POOL_RECYCLE = int(os.getenv("POSTGRES_POOL_RECYCLE", "1800"))
+    POSTGRES_POOL_PRE_PING = os.getenv("POSTGRES_POOL_PRE_PING", "true").lower() == "true"
+    POSTGRES_STATEMENT_CACHE_SIZE = int(os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "100"))
+
     MONGO_URI = os.getenv("MONGO_URI", "mongodb://etl_mongo:27017")
     MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "etl")
+    # Motor client pool. Unset optional values keep the driver defaults.
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS = _optional_int("MONGO_MAX_IDLE_TIME_MS")
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = _optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "20000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+    # Fragment records are written with unordered insert_many calls of this
+    # many documents, with up to MONGO_INSERT_CONCURRENCY batches in flight.
+    MONGO_INSERT_BATCH_SIZE = int(os.getenv("MONGO_INSERT_BATCH_SIZE", "5000"))
+    MONGO_INSERT_CONCURRENCY = int(os.getenv("MONGO_INSERT_CONCURRENCY", "4"))
+    # "majority" or a node count; journaled writes are opt-in.
+    MONGO_WRITE_CONCERN_W = os.getenv("MONGO_WRITE_CONCERN_W", "1")
+    MONGO_WRITE_CONCERN_J = os.getenv("MONGO_WRITE_CONCERN_J", "false").lower() == "true"
+
+    # Asynchronous ingest: /upload?mode=async stores the payload under
+    # INGEST_PAYLOAD_DIR (shared with the workers) and queues a job.
+    INGEST_DEFAULT_MODE = os.getenv("INGEST_DEFAULT_MODE", "sync")
+    INGEST_PAYLOAD_DIR = os.getenv(
+        "INGEST_PAYLOAD_DIR", os.path.join(tempfile.gettempdir(), "etl-ingest")
+    )
+    INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+    INGEST_RETRY_BASE_SECONDS = float(os.getenv("INGEST_RETRY_BASE_SECONDS", "5"))
+    INGEST_LEASE_SECONDS = int(os.getenv("INGEST_LEASE_SECONDS", "900"))
+    # A running job's lease is extended this often; keep it well under
+    # INGEST_LEASE_SECONDS.
+    INGEST_HEARTBEAT_SECONDS = float(os.getenv("INGEST_HEARTBEAT_SECONDS", "60"))
+    INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "1.0"))
+    INGEST_WORKER_CONCURRENCY = int(os.getenv("INGEST_WORKER_CONCURRENCY", "2"))
+
+    # POST /upload/batch: members extracted at once, and members per
+    # commit. Each member still gets its own savepoint.
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_COMMIT_SIZE = int(os.getenv("BATCH_COMMIT_SIZE", "100"))
+
+    # In-process cache answering "seen this hash for this source?" before
+    # the database is queried. The budget is split between an LRU of recent
+    # hashes and a Bloom filter rebuilt from uploaded_files at startup.
+    DEDUP_CACHE_ENABLED = os.getenv("DEDUP_CACHE_ENABLED", "true").lower() == "true"
+    DEDUP_CACHE_MEMORY_BYTES = int(os.getenv("DEDUP_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024)))
+
+    # Defaults for the sampling modes of POST /schema/infer/{source_id}.
+    SCHEMA_SAMPLE_BUDGET = int(os.getenv("SCHEMA_SAMPLE_BUDGET", "10000"))
+    SCHEMA_SAMPLE_PER_FILE = int(os.getenv("SCHEMA_SAMPLE_PER_FILE", "100"))
+    SCHEMA_CONVERGENCE_PATIENCE = int(os.getenv("SCHEMA_CONVERGENCE_PATIENCE", "1000"))
+    # Scanned records are classified this many at a time.
+    SCHEMA_SCAN_BATCH_SIZE = int(os.getenv("SCHEMA_SCAN_BATCH_SIZE", "5000"))
+
+    # GET /schema/{source_id}/latest and /versions responses are cached
+    # per worker. New versions are announced on SCHEMA_CACHE_CHANNEL with
+    # NOTIFY; a worker that is not listening does not serve from cache.
+    SCHEMA_CACHE_ENABLED = os.getenv("SCHEMA_CACHE_ENABLED", "true").lower() == "true"
+    SCHEMA_CACHE_TTL_SECONDS = float(os.getenv("SCHEMA_CACHE_TTL_SECONDS", "300"))
+    SCHEMA_CACHE_MAX_ENTRIES = int(os.getenv("SCHEMA_CACHE_MAX_ENTRIES", "1024"))
+    SCHEMA_CACHE_CHANNEL = os.getenv("SCHEMA_CACHE_CHANNEL", "schema_versions")
+    SCHEMA_CACHE_RECONNECT_SECONDS = float(os.getenv("SCHEMA_CACHE_RECONNECT_SECONDS", "5"))
+
+    # format=ndjson list responses fetch rows from a server-side cursor
+    # this many at a time.
+    NDJSON_BATCH_SIZE = int(os.getenv("NDJSON_BATCH_SIZE", "1000"))
+
+    # Per-stage timings and throughput counters served at /metrics.
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # The ingest worker has no API, so it serves its own /metrics on this
+    # port; 0 turns it off. Give each worker on a host its own port.
+    WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+
+    # Sampling profiler: ?profile=true (or X-Profile: 1) on /upload and
+    # /schema/infer, and /admin/profile. Off unless enabled, and refused
+    # until PROFILING_TOKEN is set; requests send it as X-Profiling-Token.
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN") or None
+    PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    PROFILING_MAX_SECONDS = int(os.getenv("PROFILING_MAX_SECONDS", "60"))
+    PROFILING_DIR = os.getenv(
+        "PROFILING_DIR", os.path.join(tempfile.gettempdir(), "etl-profiles")
+    )
+    PROFILING_KEEP = int(os.getenv("PROFILING_KEEP", "50"))
+
+    # Uploads are read in chunks of this size and spooled to disk, so peak
+    # memory per upload does not depend on the size of the file.
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+    # Non-PDF payloads at least this large that hold one top-level JSON
+    # array, NDJSON or CSV/TSV are parsed block by block from the spool
+    # file instead of being decoded whole.
+    STREAM_INGEST_MIN_BYTES = int(os.getenv("STREAM_INGEST_MIN_BYTES", str(8 * 1024 * 1024)))
+    JSON_STREAM_RECORDS_PER_FRAGMENT = int(os.getenv("JSON_STREAM_RECORDS_PER_FRAGMENT", "1000"))
+    # .csv/.tsv (or text/csv) payloads above the same size go row by row.
+    CSV_STREAM_ROWS_PER_FRAGMENT = int(os.getenv("CSV_STREAM_ROWS_PER_FRAGMENT", "5000"))
+    # Staged fragment rows are COPYed every this many fragments.
+    STREAM_FLUSH_FRAGMENTS = int(os.getenv("STREAM_FLUSH_FRAGMENTS", "100"))
+
+    # Worker processes for CPU-bound extraction. 0 runs extraction in a
+    # thread of the API process instead of a process pool.
+    EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+
+    # PDFs are split into jobs of this many pages across the worker pool.
+    PDF_PAGES_PER_JOB = int(os.getenv("PDF_PAGES_PER_JOB", "8"))
+    # Extracted PDF text is cached here by content hash.
+    TEXT_CACHE_DIR = os.getenv(
+        "TEXT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "etl-text-cache")
+    )
+    # Least recently used entries are evicted above this many bytes.
+    TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
 
 
 settings = Settings()
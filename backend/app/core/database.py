@@ -2,14 +2,28 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.core.pool_metrics import TimedQueuePool, mongo_pool_listener
 
 DATABASE_URL = (
     f"postgresql+asyncpg://{settings.POSTGRES_USER}:"
     f"{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_HOST}:"
     f"{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
+    # SQLAlchemy's own prepared statement cache, on top of asyncpg's.
+    f"?prepared_statement_cache_size={settings.POSTGRES_STATEMENT_CACHE_SIZE}"
 )
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    future=True,
+    poolclass=TimedQueuePool,
+    pool_size=settings.POSTGRES_POOL_SIZE,
+    max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+    pool_timeout=settings.POSTGRES_POOL_TIMEOUT,
+    pool_recycle=settings.POSTGRES_POOL_RECYCLE,
+    pool_pre_ping=settings.POSTGRES_POOL_PRE_PING,
+    connect_args={"statement_cache_size": settings.POSTGRES_STATEMENT_CACHE_SIZE},
+)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -30,7 +44,19 @@ async def get_db():
 def get_mongo_client() -> AsyncIOMotorClient:
     global _mongo_client
     if _mongo_client is None:
-        _mongo_client = AsyncIOMotorClient(settings.MONGO_URI)
+        options = {
+            "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+            "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        }
+        if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+            options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+        if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+            options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+        _mongo_client = AsyncIOMotorClient(
+            settings.MONGO_URI, event_listeners=[mongo_pool_listener], **options
+        )
     return _mongo_client
 
 
@@ -0,0 +1,66 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _warm_up_worker() -> None:
+    # Pay the parser import cost once per worker, not on the first job.
+    import bs4  # noqa: F401
+    import lxml  # noqa: F401
+    import pdfplumber  # noqa: F401
+    import app.services.extraction_jobs  # noqa: F401
+
+
+def _noop() -> None:
+    return None
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    global _process_pool
+    if _process_pool is None and settings.EXTRACTION_WORKERS > 0:
+        # spawn, not fork: the API process runs an event loop and driver
+        # threads that must not be duplicated into the workers.
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up_worker,
+        )
+    return _process_pool
+
+
+async def start_process_pool() -> None:
+    pool = get_process_pool()
+    if pool is None:
+        return
+    # Workers are started lazily; one job each brings them all up.
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        *(loop.run_in_executor(pool, _noop) for _ in range(settings.EXTRACTION_WORKERS))
+    )
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+
+
+async def run_in_process(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a picklable, module-level function off the event loop.
+    """
+    call = functools.partial(func, *args, **kwargs)
+    pool = get_process_pool()
+    if pool is None:
+        return await run_in_threadpool(call)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, call)
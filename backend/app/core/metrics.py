@@ -0,0 +1,185 @@
+"""
+In-process metrics in the Prometheus text format, without a client
+library. Each API or worker process keeps its own counters, so scrape
+every process. Stages that run in extraction worker processes are timed
+there and observed here when their result comes back.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+# Seconds; upload stages range from sub-millisecond to minutes for PDFs.
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+# Content types get their own label value; anything else is "other",
+# so arbitrary client-supplied types cannot grow the label set.
+_CONTENT_TYPES = {
+    "application/json", "application/x-ndjson", "application/ndjson", "application/jsonl",
+    "text/csv", "application/csv", "text/tab-separated-values", "text/tsv",
+    "application/pdf", "text/html", "text/plain", "text/markdown",
+    "application/xml", "text/xml", "application/octet-stream",
+    "application/zip", "application/x-tar", "application/gzip",
+}
+
+_registry: List["_Metric"] = []
+
+
+def content_type_label(content_type: Optional[str]) -> str:
+    if not content_type:
+        return "unknown"
+    mime = content_type.split(";", 1)[0].strip().lower()
+    return mime if mime in _CONTENT_TYPES else "other"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value:g}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total:g}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "etl_stage_seconds",
+    "Time spent in each upload pipeline stage.",
+    ("stage", "content_type"),
+)
+EXTRACTOR_SECONDS = Histogram(
+    "etl_extractor_seconds",
+    "Time spent in each FragmentExtractor pass.",
+    ("extractor", "content_type"),
+)
+UPLOADS = Counter(
+    "etl_uploads_total",
+    "Uploads persisted, by outcome.",
+    ("content_type", "status"),
+)
+UPLOAD_BYTES = Counter(
+    "etl_upload_bytes_total",
+    "Bytes of uploads persisted.",
+    ("content_type",),
+)
+FRAGMENTS = Counter(
+    "etl_fragments_total",
+    "Fragment rows written.",
+    ("fragment_type",),
+)
+RECORDS = Counter(
+    "etl_records_total",
+    "Records in the fragments written.",
+    ("fragment_type",),
+)
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import monitoring
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Recent acquire times kept per pool for percentiles.
+_SAMPLES = 2048
+
+
+class WaitStats:
+    """
+    Acquire times of one pool. Updated from Motor's executor threads as
+    well as the event loop, hence the lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=_SAMPLES)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, peak, timeouts = self.count, self.total, self.max, self.timeouts
+
+        def percentile(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+        return {
+            "acquired": count,
+            "timeouts": timeouts,
+            "mean_ms": round(total / count * 1000, 3) if count else None,
+            "max_ms": round(peak * 1000, 3),
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+        }
+
+
+postgres_waits = WaitStats()
+mongo_waits = WaitStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The asyncio queue pool, timing each checkout: the wait for a free
+    connection, or the connect when the pool grows into its overflow.
+    """
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            postgres_waits.record_timeout()
+            raise
+        postgres_waits.record(time.perf_counter() - started)
+        return entry
+
+
+def postgres_pool_stats(pool: Any) -> Dict[str, Any]:
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # Connections beyond `size`; negative while the pool is still
+        # below its size.
+        "overflow": pool.overflow(),
+        "max_overflow": getattr(pool, "_max_overflow", None),
+        "wait": postgres_waits.snapshot(),
+    }
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """
+    Open and checked-out connection counts per server, from the
+    driver's CMAP events, plus checkout times.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # address -> [open, checked_out]
+        self._counts: Dict[Tuple[str, int], list] = {}
+
+    def _adjust(self, address: Tuple[str, int], opened: int = 0, checked_out: int = 0) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(address, [0, 0])
+            counts[0] += opened
+            counts[1] += checked_out
+
+    def pool_created(self, event: Any) -> None:
+        self._adjust(event.address)
+
+    def pool_ready(self, event: Any) -> None:
+        pass
+
+    def pool_cleared(self, event: Any) -> None:
+        pass
+
+    def pool_closed(self, event: Any) -> None:
+        with self._lock:
+            self._counts.pop(event.address, None)
+
+    def connection_created(self, event: Any) -> None:
+        self._adjust(event.address, opened=1)
+
+    def connection_ready(self, event: Any) -> None:
+        pass
+
+    def connection_closed(self, event: Any) -> None:
+        self._adjust(event.address, opened=-1)
+
+    def connection_check_out_started(self, event: Any) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: Any) -> None:
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            mongo_waits.record_timeout()
+
+    def connection_checked_out(self, event: Any) -> None:
+        self._adjust(event.address, checked_out=1)
+        if event.duration is not None:
+            mongo_waits.record(event.duration)
+
+    def connection_checked_in(self, event: Any) -> None:
+        self._adjust(event.address, checked_out=-1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            servers = {
+                f"{host}:{port}": {
+                    "open": opened,
+                    "checked_out": checked_out,
+                    "idle": max(0, opened - checked_out),
+                }
+                for (host, port), (opened, checked_out) in self._counts.items()
+            }
+        return {
+            "checked_out": sum(s["checked_out"] for s in servers.values()),
+            "idle": sum(s["idle"] for s in servers.values()),
+            "servers": servers,
+            "wait": mongo_waits.snapshot(),
+        }
+
+
+mongo_pool_listener = MongoPoolListener()
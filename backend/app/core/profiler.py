@@ -0,0 +1,175 @@
+"""
+Opt-in sampling profiler. A background thread snapshots the stack of
+every other thread at a fixed interval and counts identical stacks, which
+is the collapsed format flamegraph.pl, speedscope and inferno read:
+
+    thread;outer (file.py:10);inner (file.py:42) 17
+
+Sampling sees the threads of this process only; extraction running in
+the process pool shows up as a wait. Nothing here runs unless
+PROFILING_ENABLED is set and a profile is requested.
+"""
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+_TRUTHY = ("1", "true", "yes")
+
+
+class StackSampler:
+    def __init__(self, interval: float):
+        self.interval = max(0.001, interval)
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="etl-profiler", daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        labels = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if not labels.keys() >= frames.keys():
+                labels = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(labels.get(ident, "thread"))
+                stack.reverse()
+                self.counts[";".join(stack)] += 1
+            self.samples += 1
+
+    def start(self) -> "StackSampler":
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - (self.started_at or time.perf_counter())
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in sorted(self.counts.items())
+        )
+
+
+class ProfileStore:
+    """
+    Collapsed profiles on disk under PROFILING_DIR, newest kept up to
+    PROFILING_KEEP.
+    """
+
+    @staticmethod
+    def _path(profile_id: str) -> str:
+        return os.path.join(settings.PROFILING_DIR, f"{profile_id}.collapsed")
+
+    @staticmethod
+    def save(sampler: StackSampler) -> str:
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        profile_id = uuid.uuid4().hex
+        with open(ProfileStore._path(profile_id), "w", encoding="utf-8") as fh:
+            fh.write(sampler.collapsed())
+        ProfileStore._prune()
+        return profile_id
+
+    @staticmethod
+    def list() -> List[dict]:
+        try:
+            names = os.listdir(settings.PROFILING_DIR)
+        except FileNotFoundError:
+            return []
+        profiles = []
+        for name in names:
+            profile_id, ext = os.path.splitext(name)
+            if ext != ".collapsed" or not _PROFILE_ID.match(profile_id):
+                continue
+            stat = os.stat(os.path.join(settings.PROFILING_DIR, name))
+            profiles.append(
+                {"id": profile_id, "created_at": stat.st_mtime, "size_bytes": stat.st_size}
+            )
+        profiles.sort(key=lambda p: p["created_at"], reverse=True)
+        return profiles
+
+    @staticmethod
+    def read(profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(ProfileStore._path(profile_id), encoding="utf-8") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _prune() -> None:
+        for profile in ProfileStore.list()[max(1, settings.PROFILING_KEEP):]:
+            try:
+                os.unlink(ProfileStore._path(profile["id"]))
+            except FileNotFoundError:
+                pass
+
+
+def check_profiling_access(token: Optional[str]) -> None:
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    # Without a configured token nobody gets in: the profiler exposes
+    # stacks and a CPU cost to whoever can reach the API.
+    if not settings.PROFILING_TOKEN:
+        raise HTTPException(status_code=403, detail="PROFILING_TOKEN is not set")
+    if token is None or not hmac.compare_digest(
+        token.encode(), settings.PROFILING_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+class RequestProfile:
+    def __init__(self) -> None:
+        self.id: Optional[str] = None
+
+
+@asynccontextmanager
+async def profile_request(request: Request) -> AsyncIterator[RequestProfile]:
+    """
+    Sample this process while the block runs, when the request asks for
+    it with ?profile=true or an X-Profile: 1 header. The stored
+    profile's id is on the yielded object afterwards. Other requests
+    served by this worker at the same time are sampled too.
+    """
+    profile = RequestProfile()
+    if not settings.PROFILING_ENABLED or not (
+        request.query_params.get("profile", "").lower() in _TRUTHY
+        or request.headers.get("x-profile", "").lower() in _TRUTHY
+    ):
+        yield profile
+        return
+
+    check_profiling_access(request.headers.get("x-profiling-token"))
+    sampler = StackSampler(settings.PROFILING_INTERVAL_MS / 1000).start()
+    try:
+        yield profile
+    finally:
+        sampler.stop()
+        profile.id = ProfileStore.save(sampler)
@@ -0,0 +1,41 @@
+from typing import Any, AsyncIterator, Callable, Dict
+
+import orjson
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class OrjsonResponse(Response):
+    """
+    JSON via orjson, which handles datetimes, UUIDs and dataclasses
+    itself. Endpoints returning one directly also skip FastAPI's
+    jsonable_encoder pass over the content.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def ndjson_response(stmt: Select, to_dict: Callable[[Any], Dict[str, Any]]) -> StreamingResponse:
+    """
+    Stream the rows of stmt as one JSON object per line, read through a
+    server-side cursor NDJSON_BATCH_SIZE rows at a time. The stream gets
+    its own session: it outlives the request's dependencies.
+    """
+
+    async def body() -> AsyncIterator[bytes]:
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                stmt.execution_options(yield_per=max(1, settings.NDJSON_BATCH_SIZE))
+            )
+            async for rows in result.partitions():
+                yield b"".join(orjson.dumps(to_dict(r)) + b"\n" for r in rows)
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
@@ -2,19 +2,28 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.core.database import engine
+from app.core.database import engine, AsyncSessionLocal
+from app.core.responses import OrjsonResponse
+from app.core.executor import start_process_pool, shutdown_process_pool
 from app.models import Base
+from app.services.dedup_cache import get_dedup_cache
+from app.services.fragment_saver import FragmentSaver
+from app.services.schema_cache import start_schema_cache_listener, stop_schema_cache_listener
 
 from app.api.v1.routes_upload import router as upload_router
 from app.api.v1.routes_schema import router as schema_router
 from app.api.v1.routes_files import router as files_router
+from app.api.v1.routes_jobs import router as jobs_router
 from app.api.v1.routes_health import router as health_router
+from app.api.v1.routes_metrics import router as metrics_router
+from app.api.v1.routes_admin import router as admin_router
 
 
 def get_application() -> FastAPI:
     app = FastAPI(
         title=settings.PROJECT_NAME,
         version="0.1.0",
+        default_response_class=OrjsonResponse,
     )
 
     app.add_middleware(
@@ -29,15 +38,33 @@ def get_application() -> FastAPI:
     async def startup_event():
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+        await FragmentSaver.ensure_indexes()
+        await start_process_pool()
+
+        dedup_cache = get_dedup_cache()
+        if dedup_cache is not None:
+            async with AsyncSessionLocal() as session:
+                await dedup_cache.rebuild(session)
+
+        start_schema_cache_listener()
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await stop_schema_cache_listener()
+        shutdown_process_pool()
 
     @app.get("/health")
     async def health_check_root():
         return {"status": "ok"}
 
     app.include_router(health_router, prefix="/api/v1")
+    # Unprefixed, where Prometheus scrapes by default.
+    app.include_router(metrics_router)
     app.include_router(upload_router, prefix=settings.API_V1_PREFIX)
     app.include_router(schema_router, prefix=settings.API_V1_PREFIX)
     app.include_router(files_router, prefix=settings.API_V1_PREFIX)
+    app.include_router(jobs_router, prefix=settings.API_V1_PREFIX)
+    app.include_router(admin_router, prefix=settings.API_V1_PREFIX)
 
     return app
 
@@ -5,5 +5,8 @@ Base = declarative_base()
 from .uploaded_file import UploadedFile
 from .parsed_fragment import ParsedFragment
 from .schema_version import SchemaVersion
+from .schema_state import SchemaState
+from .ingest_job import IngestJob
+from .source import Source
 
-__all__ = ["Base", "UploadedFile", "ParsedFragment", "SchemaVersion"]
+__all__ = ["Base", "UploadedFile", "ParsedFragment", "SchemaVersion", "SchemaState", "IngestJob", "Source"]
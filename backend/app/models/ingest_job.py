@@ -0,0 +1,34 @@
+import uuid
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Text, JSON, Index
+from sqlalchemy.sql import func
+from app.models import Base
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    source_id = Column(String, index=True, nullable=True)
+    filename = Column(String, nullable=True)
+    content_type = Column(String, nullable=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    content_hash = Column(String, nullable=False)
+    payload_path = Column(String, nullable=False)
+
+    # queued -> running -> succeeded | failed; a failed attempt with
+    # retries left goes back to queued with run_after pushed out.
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    result_json = Column(JSON, nullable=True)
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    extracted_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_ingest_jobs_status_run_after", "status", "run_after"),
+    )
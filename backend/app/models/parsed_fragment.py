@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Integer, ForeignKey, JSON
+from sqlalchemy import Column, String, Integer, BigInteger, ForeignKey, JSON, Index
 from app.models import Base
 
 
@@ -7,9 +7,22 @@ class ParsedFragment(Base):
     __tablename__ = "parsed_fragments"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    file_id = Column(String, ForeignKey("uploaded_files.id"), index=True, nullable=False)
+    file_id = Column(String, ForeignKey("uploaded_files.id"), nullable=False)
     fragment_type = Column(String, index=True, nullable=False)
-    start_offset = Column(Integer, nullable=True)
-    end_offset = Column(Integer, nullable=True)
+    # Offsets are bytes for streamed payloads, which may exceed 2 GB.
+    start_offset = Column(BigInteger, nullable=True)
+    end_offset = Column(BigInteger, nullable=True)
     record_count = Column(Integer, nullable=True)
     preview_json = Column(JSON, nullable=True)
+    # Data rows [start_row, end_row) of a streamed CSV fragment.
+    start_row = Column(BigInteger, nullable=True)
+    end_row = Column(BigInteger, nullable=True)
+    # First and last page (from 1) of a fragment extracted from a PDF.
+    start_page = Column(Integer, nullable=True)
+    end_page = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination of a file's fragments; also serves lookups by
+        # file_id alone.
+        Index("ix_parsed_fragments_file_type_id", "file_id", "fragment_type", "id"),
+    )
@@ -0,0 +1,17 @@
+import uuid
+from sqlalchemy import Column, String, BigInteger, DateTime, JSON
+from sqlalchemy.sql import func
+from app.models import Base
+
+
+# Running field -> type counts per source, folded in at ingest time.
+class SchemaState(Base):
+    __tablename__ = "schema_states"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    source_id = Column(String, unique=True, index=True, nullable=False)
+    fields_json = Column(JSON, nullable=False)
+    doc_count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -11,4 +11,7 @@ class SchemaVersion(Base):
     source_id = Column(String, index=True, nullable=False)
     version = Column(Integer, nullable=False)
     schema_json = Column(Text, nullable=False)
+    # SchemaDiffService.fingerprint of schema_json; null for rows written
+    # before fingerprints existed until they are next needed.
+    fingerprint = Column(String(32), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
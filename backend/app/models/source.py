@@ -1,15 +1,23 @@
 import uuid
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, JSON
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.models import Base
 
 
+# Per-source rollup of uploads, kept current in the ingest transaction.
 class Source(Base):
     __tablename__ = "sources"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     source_id = Column(String, unique=True, index=True, nullable=False)
 
+    file_count = Column(BigInteger, nullable=False, default=0)
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+    # fragment_type -> number of parsed_fragments rows
+    fragment_counts = Column(JSON, nullable=False, default=dict)
+    last_upload_at = Column(DateTime(timezone=True), nullable=True)
+    latest_schema_version = Column(Integer, nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Integer, DateTime, Text
+from sqlalchemy import Column, String, BigInteger, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.models import Base
 
@@ -11,7 +11,13 @@ class UploadedFile(Base):
     source_id = Column(String, index=True, nullable=True)
     filename = Column(String, nullable=False)
     content_type = Column(String, nullable=True)
-    size_bytes = Column(Integer, nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
     content_hash = Column(String, index=True, nullable=True)
     raw_text_excerpt = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("uq_uploaded_files_source_hash", "source_id", "content_hash", unique=True),
+        # Keyset pagination of /files.
+        Index("ix_uploaded_files_created_at_id", "created_at", "id"),
+    )
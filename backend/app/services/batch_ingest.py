@@ -0,0 +1,212 @@
+import asyncio
+import mimetypes
+import tarfile
+import zipfile
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.file_service import FileService, SpooledUpload
+from app.services.fragment_saver import FragmentSaver
+from app.services.ingest_service import IngestService
+
+_TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+def archive_kind(upload: UploadFile) -> Optional[str]:
+    name = (upload.filename or "").lower()
+    mime = (upload.content_type or "").lower()
+    if name.endswith(".zip") or mime in ("application/zip", "application/x-zip-compressed"):
+        return "zip"
+    if name.endswith(_TAR_SUFFIXES) or mime in ("application/x-tar", "application/x-gtar"):
+        return "tar"
+    return None
+
+
+def _iter_archive(stream: BinaryIO, kind: str) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Yield (name, file object) per regular member. Tars are read in stream
+    mode, so each member must be consumed before the next one is asked for.
+    """
+    if kind == "zip":
+        with zipfile.ZipFile(stream) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                    continue
+                with zf.open(info) as fh:
+                    yield info.filename, fh
+        return
+
+    with tarfile.open(fileobj=stream, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile():
+                continue
+            fh = tf.extractfile(member)
+            if fh is not None:
+                yield member.name, fh
+
+
+def _spool_next(members: Iterator[Tuple[str, BinaryIO]]) -> Optional[SpooledUpload]:
+    item = next(members, None)
+    if item is None:
+        return None
+    name, fh = item
+    return FileService.spool_stream(fh, name, mimetypes.guess_type(name)[0])
+
+
+class BatchIngestService:
+    """
+    Ingest many files from one request: plain multipart parts, members of
+    zip/tar archives, or both. Archive members are read straight out of
+    the uploaded archive one at a time; at most BATCH_CONCURRENCY of them
+    are spooled and extracting at once. All database writes go through
+    the request's session from this coroutine, committed every
+    BATCH_COMMIT_SIZE members.
+    """
+
+    @staticmethod
+    async def _iter_members(
+        uploads: List[UploadFile],
+        errors: List[Dict[str, Any]],
+    ) -> AsyncIterator[SpooledUpload]:
+        for upload in uploads:
+            kind = archive_kind(upload)
+            if kind is None:
+                yield await FileService.spool_upload(upload)
+                continue
+
+            try:
+                members = _iter_archive(upload.file, kind)
+                while True:
+                    spooled = await run_in_threadpool(_spool_next, members)
+                    if spooled is None:
+                        break
+                    yield spooled
+            except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+                errors.append({"filename": upload.filename, "status": "error", "error": repr(e)})
+
+    @staticmethod
+    async def _extract(spooled: SpooledUpload) -> Tuple[SpooledUpload, Optional[Dict[str, Any]], Optional[str]]:
+        # The spool file is removed once the member is written, since a
+        # streamed member is only parsed while it is persisted.
+        try:
+            return spooled, await IngestService.extract(spooled), None
+        except Exception as e:
+            return spooled, None, repr(e)
+        except BaseException:
+            spooled.cleanup()
+            raise
+
+    @staticmethod
+    async def ingest(
+        session: AsyncSession,
+        uploads: List[UploadFile],
+        source_id: Optional[str],
+        concurrency: Optional[int] = None,
+        commit_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        concurrency = max(1, concurrency or settings.BATCH_CONCURRENCY)
+        commit_size = max(1, commit_size or settings.BATCH_COMMIT_SIZE)
+
+        results: List[Dict[str, Any]] = []
+        archive_errors: List[Dict[str, Any]] = []
+        # content hash -> summary of the first member carrying it, so
+        # repeats inside the batch are not extracted twice
+        first_by_hash: Dict[str, Dict[str, Any]] = {}
+        pending: set = set()
+        uncommitted = 0
+
+        async def write(task: asyncio.Task) -> None:
+            nonlocal uncommitted
+            spooled, extraction, error = task.result()
+            summary = first_by_hash[spooled.content_hash]
+            try:
+                if error is None:
+                    async with session.begin_nested():
+                        response = await IngestService.persist(
+                            session, spooled, source_id, extraction, commit=False
+                        )
+            except Exception as e:
+                FragmentSaver.discard(session)
+                error = repr(e)
+            finally:
+                spooled.cleanup()
+            if error is not None:
+                summary.update(status="error", error=error)
+                return
+            if response.get("duplicate"):
+                # Stored by a concurrent upload since the check above.
+                summary.update(status="ok", duplicate=True, file_id=response["file_id"])
+                return
+            summary.update(
+                status="ok",
+                file_id=response["file_id"],
+                fragments=response["fragments"],
+            )
+            uncommitted += 1
+            if uncommitted >= commit_size:
+                await FragmentSaver.commit(session)
+                uncommitted = 0
+
+        async def drain(limit: int) -> None:
+            nonlocal pending
+            while len(pending) > limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    await write(task)
+
+        try:
+            async for spooled in BatchIngestService._iter_members(uploads, archive_errors):
+                summary: Dict[str, Any] = {
+                    "filename": spooled.filename,
+                    "content_hash": spooled.content_hash,
+                    "size_bytes": spooled.size_bytes,
+                    "duplicate": False,
+                }
+                results.append(summary)
+
+                first = first_by_hash.get(spooled.content_hash)
+                if first is not None:
+                    spooled.cleanup()
+                    summary.update(duplicate=True, duplicate_of=first)
+                    continue
+
+                existing = await FileService.find_existing(session, source_id, spooled.content_hash)
+                if existing:
+                    spooled.cleanup()
+                    summary.update(status="ok", duplicate=True, file_id=existing.id)
+                    first_by_hash[spooled.content_hash] = summary
+                    continue
+
+                first_by_hash[spooled.content_hash] = summary
+                pending.add(asyncio.create_task(BatchIngestService._extract(spooled)))
+                await drain(concurrency - 1)
+
+            await drain(0)
+            await FragmentSaver.commit(session)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await FragmentSaver.remove_uncommitted_records(session)
+            raise
+
+        for summary in results:
+            first = summary.pop("duplicate_of", None)
+            if first is not None:
+                summary.update(status=first.get("status"), file_id=first.get("file_id"))
+                if first.get("error"):
+                    summary["error"] = first["error"]
+
+        results.extend(archive_errors)
+        return {
+            "status": "ok",
+            "source_id": source_id,
+            "members": len(results),
+            "ingested": sum(1 for r in results if r.get("status") == "ok" and not r.get("duplicate")),
+            "duplicates": sum(1 for r in results if r.get("duplicate")),
+            "errors": sum(1 for r in results if r.get("status") == "error"),
+            "results": results,
+        }
@@ -0,0 +1,236 @@
+"""
+Column-wise type inference.
+
+Records are transposed into columns and each column is classified as a
+whole. Python-typed values (JSON numbers, booleans, nested values) are
+bucketed with one NumPy bincount over their type codes. String values,
+which is every value of a CSV, are joined into one newline-separated
+buffer and matched against a whole-column pattern per type. A column that
+is all one type, give or take blanks, is settled by a single regex call
+that runs entirely in C. Mixed columns fall back to one pass of an
+alternation over the same buffer.
+"""
+import datetime
+import json
+import re
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Semantic types for strings, most specific first.
+STRING_PATTERNS = {
+    "integer": r"[-+]?\d+",
+    "float": r"[-+]?(?:\d+\.\d*|\.\d+)(?:[eE][-+]?\d+)?|[-+]?\d+[eE][-+]?\d+",
+    "boolean": r"[Tt]rue|TRUE|[Ff]alse|FALSE",
+    "date": r"\d{4}-\d{2}-\d{2}",
+    "timestamp": r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?",
+    "uuid": r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
+    "email": r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}",
+}
+
+# Path segment for the elements of an array.
+ITEMS = "[]"
+_UNSAFE_KEY = re.compile(r'[.\[\]"]')
+_PATH_TOKEN = re.compile(r'\.?(?P<key>[^.\[\]"]+)|\[(?P<quoted>"(?:[^"\\]|\\.)*")\]|\[\]')
+
+TYPE_NAMES = (
+    "null", "boolean", "integer", "float", "date", "timestamp",
+    "uuid", "email", "string", "object", "array",
+)
+
+_SINGLE = {name: re.compile(pattern) for name, pattern in STRING_PATTERNS.items()}
+# Every line of the buffer is one of the type or blank. Atomic groups keep
+# a failed match from backtracking into lines that already matched.
+_WHOLE_COLUMN = {
+    name: re.compile(rf"(?>(?>{pattern})?\n)*(?>{pattern})?")
+    for name, pattern in STRING_PATTERNS.items()
+}
+# One match per line, so finditer steps from line to line instead of
+# trying every character position; lines matching no type are "string".
+_ANY_LINE = re.compile(
+    "^(?:"
+    + "|".join(rf"(?P<{name}>{pattern})$" for name, pattern in STRING_PATTERNS.items())
+    + r"|(?P<string>[^\n]+)$|$)",
+    re.MULTILINE,
+)
+
+# Type codes for Python values; index into _CODE_NAMES. Strings get their
+# type from their content, anything unknown is a plain string.
+_CODE_NAMES = (
+    "null", "boolean", "integer", "float", "string", "object", "array", "timestamp", "date", "string",
+)
+
+
+class _CodeMap(dict):
+    def __missing__(self, key: type) -> int:
+        return _OTHER_CODE
+
+
+_CODES = _CodeMap({
+    type(None): 0,
+    bool: 1,
+    int: 2,
+    float: 3,
+    str: 4,
+    dict: 5,
+    list: 6,
+    datetime.datetime: 7,
+    datetime.date: 8,
+})
+_STR_CODE = 4
+_OTHER_CODE = 9
+
+
+def classify_value(value: Any) -> str:
+    """
+    Type of a single value, by the same rules as classify_column.
+    """
+    code = _CODES[type(value)]
+    if code != _STR_CODE:
+        return _CODE_NAMES[code]
+    if value == "":
+        return "null"
+    for name, pattern in _SINGLE.items():
+        if pattern.fullmatch(value):
+            return name
+    return "string"
+
+
+def _classify_strings(values: List[str]) -> Dict[str, int]:
+    total = len(values)
+    blanks = values.count("")
+    counts: Dict[str, int] = {"null": blanks} if blanks else {}
+    if blanks == total:
+        return counts
+
+    buffer = "\n".join(values)
+    if buffer.count("\n") != total - 1:
+        # A value spans lines; the buffer cannot be split back per value.
+        for value in values:
+            if value:
+                t = classify_value(value)
+                counts[t] = counts.get(t, 0) + 1
+        return counts
+
+    # Unsigned integer columns (ids, counts) are common enough for a
+    # shortcut that skips the regex entirely.
+    digits = buffer.replace("\n", "")
+    if digits.isascii() and digits.isdigit():
+        counts["integer"] = total - blanks
+        return counts
+
+    for name, whole in _WHOLE_COLUMN.items():
+        if whole.fullmatch(buffer):
+            counts[name] = total - blanks
+            return counts
+
+    matched = Counter(m.lastgroup for m in _ANY_LINE.finditer(buffer))
+    matched.pop(None, None)  # blank lines, counted above
+    counts.update(matched)
+    return counts
+
+
+def classify_column(values: Sequence[Any]) -> Dict[str, int]:
+    """
+    Count of values per type for one column.
+    """
+    total = len(values)
+    if total == 0:
+        return {}
+
+    kinds = set(map(type, values))
+    if kinds == {str}:
+        return _classify_strings(values if isinstance(values, list) else list(values))
+
+    codes = np.fromiter(map(_CODES.__getitem__, map(type, values)), dtype=np.int8, count=total)
+    by_code = np.bincount(codes, minlength=len(_CODE_NAMES))
+
+    counts: Dict[str, int] = {}
+    for code, n in enumerate(by_code.tolist()):
+        if n and code != _STR_CODE:
+            name = _CODE_NAMES[code]
+            counts[name] = counts.get(name, 0) + n
+
+    if str in kinds:
+        strings = [values[i] for i in np.flatnonzero(codes == _STR_CODE).tolist()]
+        for name, n in _classify_strings(strings).items():
+            counts[name] = counts.get(name, 0) + n
+    return counts
+
+
+def _columns(records: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Transpose records into columns. When every record carries every key,
+    as rows of a CSV do, each column is pulled with one C-level map.
+    """
+    keys = dict.fromkeys(chain.from_iterable(records))
+    if set(map(len, records)) == {len(keys)}:
+        return {key: list(map(itemgetter(key), records)) for key in keys}
+    return {key: [r[key] for r in records if key in r] for key in keys}
+
+
+def child_path(parent: str, key: str) -> str:
+    """
+    Path of `key` inside the object at `parent`: a.b for plain keys,
+    a["x.y"] for keys that contain path syntax. Top-level keys are bare.
+    """
+    if not key or _UNSAFE_KEY.search(key):
+        return f"{parent}[{json.dumps(key)}]"
+    return f"{parent}.{key}" if parent else key
+
+
+def split_path(path: str) -> List[Optional[str]]:
+    """
+    Inverse of child_path; array elements appear as None.
+    """
+    parts = []
+    for m in _PATH_TOKEN.finditer(path):
+        if m.group("key") is not None:
+            parts.append(m.group("key"))
+        elif m.group("quoted") is not None:
+            parts.append(json.loads(m.group("quoted")))
+        else:
+            parts.append(None)
+    return parts
+
+
+def _infer_objects(stats: Dict[str, Any], prefix: str, records: List[Dict[str, Any]]) -> None:
+    for key, column in _columns(records).items():
+        path = child_path(prefix, key)
+        _infer_values(stats, path, column)
+
+
+def _infer_values(stats: Dict[str, Any], path: str, column: Sequence[Any]) -> None:
+    types = classify_column(column)
+    stats[path] = {"types": types, "count": len(column)}
+    # Only columns that hold objects or arrays are descended into.
+    if types.get("object"):
+        _infer_objects(stats, path, [v for v in column if type(v) is dict])
+    if types.get("array"):
+        elements = list(chain.from_iterable(v for v in column if type(v) is list))
+        if elements:
+            _infer_values(stats, path + ITEMS, elements)
+
+
+def infer_columns(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Field stats for a batch of records, in the
+    path -> {"types": {type: count}, "count": n} shape of the schema state.
+    Nested fields are included under their path (a.b, tags[], tags[].x);
+    a nested count is the number of parent values that carry the field.
+    """
+    if not isinstance(records, list):
+        records = list(records)
+    stats: Dict[str, Any] = {}
+    _infer_objects(stats, "", records)
+    return stats
+
+
+def null_ratio(meta: Dict[str, Any]) -> float:
+    count = meta.get("count") or 0
+    if not count:
+        return 0.0
+    return meta["types"].get("null", 0) / count
@@ -0,0 +1,127 @@
+import csv
+import sys
+from typing import Any, BinaryIO, Dict, Iterator, List
+
+from app.services.file_service import SpooledUpload
+
+CSV_TYPES = ("text/csv", "application/csv", "text/tab-separated-values", "text/tsv")
+CSV_SUFFIXES = (".csv", ".tsv", ".tab")
+_TAB_SUFFIXES = (".tsv", ".tab")
+_BOM = b"\xef\xbb\xbf"
+
+# Values beyond the header go under this key, as csv.DictReader's restkey.
+EXTRA_FIELDS_KEY = "_extra"
+
+# csv caps a field at 128 KB by default and raises mid-stream past that;
+# a quoted cell may be as large as the file. Capped at what a C long
+# holds everywhere.
+_FIELD_SIZE_LIMIT = min(sys.maxsize, 2**31 - 1)
+
+
+def is_csv(spooled: SpooledUpload) -> bool:
+    name = (spooled.filename or "").lower()
+    mime = (spooled.content_type or "").lower().split(";")[0].strip()
+    return name.endswith(CSV_SUFFIXES) or mime in CSV_TYPES
+
+
+def sniff_dialect(spooled: SpooledUpload, sample_bytes: int = 64 * 1024) -> type:
+    name = (spooled.filename or "").lower()
+    mime = (spooled.content_type or "").lower()
+    if name.endswith(_TAB_SUFFIXES) or "tab-separated" in mime or "tsv" in mime:
+        return csv.excel_tab
+    with spooled.open() as fh:
+        sample = fh.read(sample_bytes)
+    if sample.startswith(_BOM):
+        sample = sample[len(_BOM):]
+    # Cut at the last newline so the sniffer never sees a partial row.
+    cut = sample.rfind(b"\n")
+    if cut > 0:
+        sample = sample[:cut]
+    try:
+        return csv.Sniffer().sniff(sample.decode("utf-8", "replace"), delimiters=",\t;|")
+    except csv.Error:
+        return csv.excel
+
+
+def _header(row: List[str]) -> List[str]:
+    names = []
+    for i, name in enumerate(row):
+        name = name.strip() or f"column_{i}"
+        names.append(name if name not in names else f"{name}_{i}")
+    return names
+
+
+def iter_csv_blocks(
+    fh: BinaryIO,
+    dialect: Any,
+    rows_per_fragment: int,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Read a delimited file row by row and yield blocks of up to
+    rows_per_fragment rows. Each block carries the byte range it was read
+    from and its data rows as [start_row, end_row), counted from 0 after
+    the header. Only the block being filled is held in memory.
+
+    csv.reader pulls exactly the lines a row spans, quoted newlines
+    included, so the bytes consumed when it yields a row are the row's
+    end offset.
+    """
+    consumed = 0
+
+    def lines() -> Iterator[str]:
+        nonlocal consumed
+        for raw in fh:
+            if consumed == 0 and raw.startswith(_BOM):
+                consumed = len(_BOM)
+                raw = raw[len(_BOM):]
+            consumed += len(raw)
+            yield raw.decode("utf-8", "replace")
+
+    # The limit is process-wide; it is only ever raised, and only once a
+    # file is actually streamed.
+    if csv.field_size_limit() < _FIELD_SIZE_LIMIT:
+        csv.field_size_limit(_FIELD_SIZE_LIMIT)
+    reader = csv.reader(lines(), dialect)
+    header = None
+    for row in reader:
+        if row:
+            header = _header(row)
+            break
+    if header is None:
+        return
+
+    width = len(header)
+    rows: List[Dict[str, Any]] = []
+    start_offset = consumed
+    row_number = 0
+    for row in reader:
+        if not row:
+            if not rows:
+                start_offset = consumed
+            continue
+        record: Dict[str, Any] = dict(zip(header, row))
+        if len(row) > width:
+            record[EXTRA_FIELDS_KEY] = row[width:]
+        elif len(row) < width:
+            for name in header[len(row):]:
+                record[name] = None
+        rows.append(record)
+        row_number += 1
+        if len(rows) >= rows_per_fragment:
+            yield {
+                "start_offset": start_offset,
+                "end_offset": consumed,
+                "start_row": row_number - len(rows),
+                "end_row": row_number,
+                "rows": rows,
+            }
+            rows = []
+            start_offset = consumed
+    if rows:
+        yield {
+            "start_offset": start_offset,
+            "end_offset": consumed,
+            "start_row": row_number - len(rows),
+            "end_row": row_number,
+            "rows": rows,
+        }
@@ -0,0 +1,145 @@
+import hashlib
+import math
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.uploaded_file import UploadedFile
+
+# Rough per-entry cost of the LRU (key tuple, two str objects, dict slot).
+_LRU_ENTRY_BYTES = 320
+
+HIT = "hit"
+MISS = "miss"
+MAYBE = "maybe"
+
+
+class BloomFilter:
+    def __init__(self, size_bytes: int, expected_items: int):
+        self.size_bits = max(8, size_bytes * 8)
+        self.bits = bytearray(self.size_bits // 8)
+        n = max(1, expected_items)
+        self.hash_count = min(16, max(1, round(self.size_bits / n * math.log(2))))
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size_bits
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupCache:
+    """
+    Answers "has this source already uploaded this hash?" without a query
+    where possible: a bounded LRU of recent (source_id, hash) -> file_id
+    for positives, and a Bloom filter of every stored pair for negatives.
+    The Bloom filter only knows what this process has seen, so a negative
+    is always confirmed by the unique (source_id, content_hash) index on
+    insert rather than trusted outright.
+    """
+
+    def __init__(self, memory_bytes: int):
+        self.memory_bytes = memory_bytes
+        self.lru_capacity = max(1, (memory_bytes // 4) // _LRU_ENTRY_BYTES)
+        self._lru: "OrderedDict[Tuple[Optional[str], str], str]" = OrderedDict()
+        self._bloom = BloomFilter(memory_bytes - memory_bytes // 4, self.lru_capacity)
+        self.counters: Dict[str, int] = {
+            "lru_hits": 0,
+            "bloom_negatives": 0,
+            "bloom_maybes": 0,
+            "db_hits": 0,
+            "false_positives": 0,
+        }
+
+    @staticmethod
+    def _bloom_key(source_id: str, content_hash: str) -> str:
+        return f"{source_id}\x00{content_hash}"
+
+    def check(self, source_id: Optional[str], content_hash: str) -> Tuple[str, Optional[str]]:
+        key = (source_id, content_hash)
+        file_id = self._lru.get(key)
+        if file_id is not None:
+            self._lru.move_to_end(key)
+            self.counters["lru_hits"] += 1
+            return HIT, file_id
+        # Uploads without a source match a hash from any source, which the
+        # per-source Bloom filter cannot answer.
+        if source_id and self._bloom_key(source_id, content_hash) not in self._bloom:
+            self.counters["bloom_negatives"] += 1
+            return MISS, None
+        self.counters["bloom_maybes"] += 1
+        return MAYBE, None
+
+    def record_lookup(self, found: bool) -> None:
+        self.counters["db_hits" if found else "false_positives"] += 1
+
+    def add(self, source_id: Optional[str], content_hash: str, file_id: str) -> None:
+        if source_id:
+            self._bloom.add(self._bloom_key(source_id, content_hash))
+        key = (source_id, content_hash)
+        self._lru[key] = file_id
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.lru_capacity:
+            self._lru.popitem(last=False)
+
+    def discard(self, source_id: Optional[str], content_hash: str) -> None:
+        self._lru.pop((source_id, content_hash), None)
+
+    async def rebuild(self, session: AsyncSession) -> int:
+        """
+        Reload the Bloom filter from uploaded_files, sized for the current
+        row count with headroom for growth.
+        """
+        total = (
+            await session.execute(
+                select(func.count()).select_from(UploadedFile).where(
+                    UploadedFile.source_id.is_not(None),
+                    UploadedFile.content_hash.is_not(None),
+                )
+            )
+        ).scalar_one()
+        self._bloom = BloomFilter(self.memory_bytes - self.memory_bytes // 4, total * 2)
+        self._lru.clear()
+
+        loaded = 0
+        stream = await session.stream(
+            select(UploadedFile.source_id, UploadedFile.content_hash).where(
+                UploadedFile.source_id.is_not(None),
+                UploadedFile.content_hash.is_not(None),
+            )
+        )
+        async for source_id, content_hash in stream:
+            self._bloom.add(self._bloom_key(source_id, content_hash))
+            loaded += 1
+        return loaded
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.counters,
+            "lru_entries": len(self._lru),
+            "lru_capacity": self.lru_capacity,
+            "bloom_bits": self._bloom.size_bits,
+            "bloom_hash_count": self._bloom.hash_count,
+            "memory_bytes": self.memory_bytes,
+        }
+
+
+_dedup_cache: Optional[DedupCache] = None
+
+
+def get_dedup_cache() -> Optional[DedupCache]:
+    global _dedup_cache
+    if _dedup_cache is None and settings.DEDUP_CACHE_ENABLED:
+        _dedup_cache = DedupCache(settings.DEDUP_CACHE_MEMORY_BYTES)
+    return _dedup_cache
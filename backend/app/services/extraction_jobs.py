@@ -0,0 +1,158 @@
+import asyncio
+import time
+from bisect import bisect_right
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pdfplumber
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.executor import run_in_process
+from app.services.file_service import FileService, SpooledUpload
+from app.services.fragment_extractor import FragmentExtractor
+from app.services.schema_inference import SchemaInferenceService
+from app.services.text_cache import TextCache
+
+
+# (extraction key, pass) in the order the passes run.
+_EXTRACTORS = (
+    ("json_blocks", FragmentExtractor.extract_json_blocks),
+    ("csv_blocks", FragmentExtractor.extract_csv_blocks),
+    ("kv_blocks", FragmentExtractor.extract_kv_blocks),
+    ("html_tables", FragmentExtractor.extract_html_tables),
+    ("text_block", FragmentExtractor.extract_text_block),
+)
+
+# Characters of the text block kept; the text fragment only stores a
+# preview of it and its length.
+TEXT_BLOCK_PREVIEW_CHARS = 1000
+
+
+def _iter_batches(extraction: Dict[str, Any]) -> Iterator[List[dict]]:
+    for block in extraction["json_blocks"]:
+        yield block["records"]
+    for block in extraction["csv_blocks"]:
+        yield block["rows"]
+    for block in extraction["html_tables"]:
+        yield block["rows"]
+    for block in extraction["kv_blocks"]:
+        yield [block["pairs"]]
+
+
+def extract_fragments(text: str) -> Dict[str, Any]:
+    """
+    Every FragmentExtractor pass over already extracted text, plus the
+    field stats of the extracted records for the source's schema state.
+    The text block is cut to a preview plus its length, so the text does
+    not travel back from a worker process.
+    Stage timings come back under "timings", since this may run in a
+    worker process whose metrics nobody scrapes.
+    """
+    extraction: Dict[str, Any] = {
+        "text_length": len(text),
+        "text_excerpt": text[:1000],
+    }
+    timings: Dict[str, Dict[str, float]] = {"stages": {}, "extractors": {}}
+    for key, extractor in _EXTRACTORS:
+        started = time.perf_counter()
+        extraction[key] = extractor(text)
+        timings["extractors"][key] = time.perf_counter() - started
+    extraction["timings"] = timings
+    text_block = extraction["text_block"]
+    extraction["text_block"] = text_block[:TEXT_BLOCK_PREVIEW_CHARS]
+    extraction["text_block_length"] = len(text_block)
+
+    started = time.perf_counter()
+    field_stats: Dict[str, Any] = {}
+    doc_count = 0
+    for batch in _iter_batches(extraction):
+        SchemaInferenceService.merge_field_stats(
+            field_stats, SchemaInferenceService.infer_batch(batch)
+        )
+        doc_count += len(batch)
+    extraction["field_stats"] = field_stats
+    extraction["doc_count"] = doc_count
+    timings["stages"]["infer_fields"] = time.perf_counter() - started
+    return extraction
+
+
+def extract_upload(spooled: SpooledUpload) -> Dict[str, Any]:
+    """
+    Text extraction plus every FragmentExtractor pass for one upload.
+    Runs in an extraction worker process, so only the results travel
+    back to the API process, not the decoded text.
+    """
+    started = time.perf_counter()
+    text = FileService.read_text(spooled)
+    elapsed = time.perf_counter() - started
+    extraction = extract_fragments(text)
+    extraction["timings"]["stages"]["extract_text"] = elapsed
+    return extraction
+
+
+def count_pdf_pages(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_pdf_pages(path: str, start: int, stop: int) -> List[str]:
+    with pdfplumber.open(path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages[start:stop]]
+
+
+async def extract_pdf_text(spooled: SpooledUpload) -> Tuple[str, List[int]]:
+    """
+    Extract PDF text with page ranges spread over the worker pool.
+    Returns the text and the offset at which each page starts in it.
+    Results are cached by content hash, so a re-upload skips pdfplumber.
+    """
+    cached = await run_in_threadpool(TextCache.get, spooled.content_hash)
+    if cached is not None:
+        return cached["text"], cached["page_offsets"]
+
+    try:
+        page_count = await run_in_process(count_pdf_pages, spooled.path)
+        step = max(1, settings.PDF_PAGES_PER_JOB)
+        chunks = await asyncio.gather(
+            *(
+                run_in_process(extract_pdf_pages, spooled.path, start, start + step)
+                for start in range(0, page_count, step)
+            )
+        )
+    except Exception:
+        return "", []
+
+    page_offsets: List[int] = []
+    offset = 0
+    for chunk in chunks:
+        for page_text in chunk:
+            page_offsets.append(offset)
+            offset += len(page_text) + 1
+    text = "\n".join(page_text for chunk in chunks for page_text in chunk)
+
+    await run_in_threadpool(TextCache.put, spooled.content_hash, text, page_offsets)
+    return text, page_offsets
+
+
+def _annotate_pages(blocks: List[dict], page_offsets: List[int]) -> None:
+    for block in blocks:
+        if not isinstance(block, dict) or block.get("start_offset") is None:
+            continue
+        block["start_page"] = bisect_right(page_offsets, block["start_offset"])
+        block["end_page"] = bisect_right(page_offsets, max(block["end_offset"] - 1, 0))
+
+
+async def run_extraction(spooled: SpooledUpload) -> Dict[str, Any]:
+    if not FileService.is_pdf(spooled):
+        return await run_in_process(extract_upload, spooled)
+
+    started = time.perf_counter()
+    text, page_offsets = await extract_pdf_text(spooled)
+    elapsed = time.perf_counter() - started
+    extraction = await run_in_process(extract_fragments, text)
+    extraction["timings"]["stages"]["extract_text"] = elapsed
+    extraction["page_offsets"] = page_offsets
+    if page_offsets:
+        for key in ("json_blocks", "csv_blocks", "kv_blocks", "html_tables"):
+            _annotate_pages(extraction[key], page_offsets)
+    return extraction
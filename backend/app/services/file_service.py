@@ -1,81 +1,265 @@
 import hashlib
 import mimetypes
+import mmap
+import os
+import tempfile
+import time
 import uuid
-from typing import Optional
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.core.config import settings
+from app.core.metrics import STAGE_SECONDS, content_type_label
 from app.models.uploaded_file import UploadedFile
+from app.services.dedup_cache import HIT, MAYBE, get_dedup_cache
+from app.services.source_stats import SourceStatsService
 import pdfplumber
 
 
+class SpooledUpload:
+    """
+    An upload that has been streamed to a temporary file on disk.
+    Extractors read it through a file handle or a read-only mmap
+    instead of holding the raw bytes in memory.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        filename: Optional[str],
+        content_type: Optional[str],
+        size_bytes: int,
+        content_hash: str,
+    ):
+        self.path = path
+        self.filename = filename
+        self.content_type = content_type
+        self.size_bytes = size_bytes
+        self.content_hash = content_hash
+
+    def open(self) -> BinaryIO:
+        return open(self.path, "rb")
+
+    @contextmanager
+    def mmap(self) -> Iterator[Union[mmap.mmap, bytes]]:
+        # mmap refuses zero-length files, hand out an empty buffer instead
+        if self.size_bytes == 0:
+            yield b""
+            return
+        with open(self.path, "rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mapped
+            finally:
+                mapped.close()
+
+    def cleanup(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
 class FileService:
     @staticmethod
-    async def compute_hash(file_bytes: bytes) -> str:
-        return hashlib.sha256(file_bytes).hexdigest()
+    def spool_stream(
+        stream: BinaryIO,
+        filename: Optional[str],
+        content_type: Optional[str],
+        chunk_size: Optional[int] = None,
+        spool_dir: Optional[str] = None,
+    ) -> SpooledUpload:
+        """
+        Copy a binary stream to a temporary file in chunks, updating the
+        SHA-256 digest as it goes. Blocking; call it from a thread.
+        spool_dir overrides UPLOAD_SPOOL_DIR.
+        """
+        chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size_bytes = 0
+        started = time.perf_counter()
+        hashing = 0.0
+
+        fd, path = tempfile.mkstemp(
+            prefix="etl-upload-", dir=spool_dir or settings.UPLOAD_SPOOL_DIR
+        )
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    hash_started = time.perf_counter()
+                    digest.update(chunk)
+                    hashing += time.perf_counter() - hash_started
+                    out.write(chunk)
+                    size_bytes += len(chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        label = content_type_label(content_type)
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="spool", content_type=label)
+        STAGE_SECONDS.observe(hashing, stage="hash", content_type=label)
+        return SpooledUpload(
+            path=path,
+            filename=filename,
+            content_type=content_type,
+            size_bytes=size_bytes,
+            content_hash=digest.hexdigest(),
+        )
+
+    @staticmethod
+    async def spool_upload(
+        file: UploadFile,
+        chunk_size: Optional[int] = None,
+        spool_dir: Optional[str] = None,
+    ) -> SpooledUpload:
+        """
+        Spool an upload to disk with one thread hop for the whole copy
+        rather than one per chunk.
+        """
+        return await run_in_threadpool(
+            FileService.spool_stream,
+            file.file,
+            file.filename,
+            file.content_type,
+            chunk_size,
+            spool_dir,
+        )
+
+    @staticmethod
+    def _decode(spooled: SpooledUpload) -> str:
+        with spooled.mmap() as buf:
+            return str(buf, "utf-8", "ignore")
 
     @staticmethod
-    async def extract_text(file: UploadFile, file_bytes: bytes) -> str:
-        mime = file.content_type or mimetypes.guess_type(file.filename)[0]
+    async def extract_text(spooled: SpooledUpload) -> str:
+        return FileService.read_text(spooled)
+
+    @staticmethod
+    def is_pdf(spooled: SpooledUpload) -> bool:
+        filename = spooled.filename or ""
+        mime = spooled.content_type or mimetypes.guess_type(filename)[0]
         if mime is None:
-            return file_bytes.decode("utf-8", errors="ignore")
+            return False
 
         mime = mime.lower()
 
         if "text/plain" in mime:
-            return file_bytes.decode("utf-8", errors="ignore")
+            return False
 
-        if file.filename.lower().endswith(".md"):
-            return file_bytes.decode("utf-8", errors="ignore")
+        if filename.lower().endswith(".md"):
+            return False
 
-        if "pdf" in mime:
+        return "pdf" in mime
+
+    @staticmethod
+    def read_text(spooled: SpooledUpload) -> str:
+        """
+        Synchronous text extraction, safe to run in a worker process.
+        """
+        if FileService.is_pdf(spooled):
             try:
-                with pdfplumber.open(file.file) as pdf:
+                with pdfplumber.open(spooled.path) as pdf:
                     pages = [page.extract_text() or "" for page in pdf.pages]
                     return "\n".join(pages)
             except Exception:
                 return ""
 
-        return file_bytes.decode("utf-8", errors="ignore")
+        return FileService._decode(spooled)
 
     @staticmethod
-    async def save_file_record(
+    async def find_existing(
         session: AsyncSession,
         source_id: Optional[str],
-        file: UploadFile,
         content_hash: str,
-        text_excerpt: str,
-        size_bytes: int,
-    ) -> UploadedFile:
-        if source_id:
-            stmt = select(UploadedFile).where(
-                UploadedFile.source_id == source_id,
-                UploadedFile.content_hash == content_hash,
-            )
-            result = await session.execute(stmt)
-            existing = result.scalars().first()
+    ) -> Optional[UploadedFile]:
+        cache = get_dedup_cache()
+        verdict, cached_id = (MAYBE, None) if cache is None else cache.check(source_id, content_hash)
+
+        if verdict == HIT:
+            existing = await session.get(UploadedFile, cached_id)
             if existing:
                 return existing
-        else:
-            stmt = select(UploadedFile).where(UploadedFile.content_hash == content_hash)
+            cache.discard(source_id, content_hash)
+            verdict = MAYBE
+
+        if verdict == MAYBE:
+            if source_id:
+                stmt = select(UploadedFile).where(
+                    UploadedFile.source_id == source_id,
+                    UploadedFile.content_hash == content_hash,
+                )
+            else:
+                stmt = select(UploadedFile).where(UploadedFile.content_hash == content_hash)
             result = await session.execute(stmt)
             existing = result.scalars().first()
+            if cache is not None:
+                cache.record_lookup(existing is not None)
             if existing:
+                if cache is not None:
+                    cache.add(source_id, content_hash, existing.id)
                 return existing
+        return None
+
+    @staticmethod
+    async def save_file_record(
+        session: AsyncSession,
+        source_id: Optional[str],
+        file: Union[UploadFile, SpooledUpload],
+        content_hash: str,
+        text_excerpt: str,
+        size_bytes: int,
+    ) -> Tuple[UploadedFile, bool]:
+        """
+        The file's row and whether this call created it. When the source
+        already has this hash, the existing row comes back with False and
+        the caller must not write the upload's fragments again.
+        """
+        cache = get_dedup_cache()
+        existing = await FileService.find_existing(session, source_id, content_hash)
+        if existing:
+            return existing, False
 
         filename = file.filename
         if not filename:
             filename = source_id or str(uuid.uuid4())
 
-        uploaded = UploadedFile(
-            source_id=source_id,
-            filename=filename,
-            content_type=file.content_type,
-            size_bytes=size_bytes,
-            content_hash=content_hash,
-            raw_text_excerpt=text_excerpt[:1000],
+        # Not committed: the caller commits once the upload's fragments are
+        # written, all in the same transaction. The unique index on
+        # (source_id, content_hash) settles races the cache cannot see.
+        stmt = (
+            pg_insert(UploadedFile)
+            .values(
+                id=str(uuid.uuid4()),
+                source_id=source_id,
+                filename=filename,
+                content_type=file.content_type,
+                size_bytes=size_bytes,
+                content_hash=content_hash,
+                raw_text_excerpt=text_excerpt[:1000],
+            )
+            .on_conflict_do_nothing(index_elements=["source_id", "content_hash"])
+            .returning(UploadedFile)
         )
-        session.add(uploaded)
-        await session.commit()
-        await session.refresh(uploaded)
-        return uploaded
+        uploaded = (await session.scalars(stmt)).first()
+        created = uploaded is not None
+        if created:
+            SourceStatsService.stage_file(session, source_id, size_bytes)
+        else:
+            stmt = select(UploadedFile).where(
+                UploadedFile.source_id == source_id,
+                UploadedFile.content_hash == content_hash,
+            )
+            uploaded = (await session.execute(stmt)).scalars().one()
+
+        if cache is not None:
+            cache.add(source_id, content_hash, uploaded.id)
+        return uploaded, created
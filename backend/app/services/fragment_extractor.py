@@ -1,24 +1,132 @@
 import re
-import json
 import csv
 from io import StringIO
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Union
 from bs4 import BeautifulSoup
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    import json
+
+    _json_loads = json.loads
+
+
+# Structural characters and complete JSON strings are the only tokens the
+# scanner visits. A JSON string cannot contain a raw newline, so a stray
+# quote that is never closed on its line is skipped as a single character.
+_JSON_TOKEN = re.compile(r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"|[{}\[\]"]')
+_JSON_TOKEN_B = re.compile(rb'"[^"\\\n]*(?:\\.[^"\\\n]*)*"|[{}\[\]"]')
+
+
+def _scan_json_spans(text: Union[str, bytes]) -> List[Tuple[int, int]]:
+    """
+    Single pass over the input matching brackets outside of strings.
+    Returns every balanced {...} / [...] span as (start, end), ordered by
+    start so an enclosing span always precedes the spans nested inside it.
+    Openers that are never matched are dropped.
+    """
+    if isinstance(text, str):
+        token = _JSON_TOKEN
+        quote, openers, pairs = '"', "{[", {"}": "{", "]": "["}
+    else:
+        token = _JSON_TOKEN_B
+        quote, openers, pairs = ord('"'), (ord("{"), ord("[")), {ord("}"): ord("{"), ord("]"): ord("[")}
+
+    # Parallel int lists rather than one object per span keep the garbage
+    # collector out of the way on inputs with millions of brackets.
+    starts: List[int] = []
+    ends: List[int] = []
+    stack: List[Tuple[Any, int]] = []  # (opener, index into starts/ends)
+    open_counts = {o: 0 for o in openers}
+
+    pos = 0
+    while True:
+        m = token.search(text, pos)
+        if m is None:
+            break
+        i = m.start()
+        ch = text[i]
+
+        if ch == quote:
+            # Strings only mean something inside a candidate; outside one
+            # the quote is prose and scanning resumes right after it.
+            pos = m.end() if stack else i + 1
+            continue
+
+        pos = i + 1
+
+        if ch in openers:
+            stack.append((ch, len(starts)))
+            starts.append(i)
+            ends.append(-1)
+            open_counts[ch] += 1
+            continue
+
+        opener = pairs[ch]
+        if not open_counts[opener]:
+            continue
+        # Drop unmatched openers between here and the matching one.
+        while stack[-1][0] != opener:
+            open_counts[stack.pop()[0]] -= 1
+        _, idx = stack.pop()
+        open_counts[opener] -= 1
+        ends[idx] = i + 1
+
+    return [(start, end) for start, end in zip(starts, ends) if end >= 0]
+
 
 class FragmentExtractor:
     @staticmethod
-    def extract_json_blocks(text: str) -> List[Dict[str, Any]]:
-        candidates = re.findall(r"\{.*?\}", text, flags=re.DOTALL)
-        valid = []
-        for c in candidates:
+    def extract_json_blocks(text: Union[str, bytes]) -> List[Dict[str, Any]]:
+        """
+        Find top-level JSON objects and arrays embedded in text.
+
+        Each block looks like:
+        {
+            "start_offset": ...,
+            "end_offset": ...,
+            "record_count": ...,
+            "records": [ {...}, ... ]
+        }
+        Offsets index into ``text``: characters for ``str`` input, bytes
+        for ``bytes``/``mmap`` input. Each span is parsed at most once: one
+        that parses covers the spans nested in it, even when it holds no
+        objects, and one that fails is skipped for the spans inside it.
+        """
+        blocks = []
+        covered = 0
+        for start, end in _scan_json_spans(text):
+            if start < covered:
+                continue
             try:
-                parsed = json.loads(c)
-                if isinstance(parsed, dict):
-                    valid.append(parsed)
+                parsed = _json_loads(text[start:end])
             except Exception:
                 continue
-        return valid
+            # Whatever it holds, a parsed span is done: the spans nested in
+            # it are never parsed again.
+            covered = end
+
+            if isinstance(parsed, dict):
+                records = [parsed]
+            elif isinstance(parsed, list):
+                records = [item for item in parsed if isinstance(item, dict)]
+                if not records:
+                    continue
+            else:
+                continue
+
+            blocks.append(
+                {
+                    "start_offset": start,
+                    "end_offset": end,
+                    "record_count": len(records),
+                    "records": records,
+                }
+            )
+        return blocks
 
     @staticmethod
     def extract_csv_blocks(text: str) -> List[Dict[str, Any]]:
@@ -56,16 +164,16 @@ class FragmentExtractor:
         return blocks
 
     @staticmethod
-    def extract_kv_blocks(text: str) -> List[Dict[str, str]]:
+    def extract_kv_blocks(text: str) -> List[Dict[str, Any]]:
         pattern = r"([A-Za-z0-9_ ]+):\s*([^\n]+)"
         matches = re.findall(pattern, text)
         if not matches:
             return []
         kv = {k.strip(): v.strip() for k, v in matches}
-        return [kv]
+        return [{"pairs": kv}]
 
     @staticmethod
-    def extract_html_tables(text: str) -> List[List[Dict[str, Any]]]:
+    def extract_html_tables(text: str) -> List[Dict[str, Any]]:
         soup = BeautifulSoup(text, "html.parser")
         tables = soup.find_all("table")
         result = []
@@ -78,7 +186,7 @@ class FragmentExtractor:
             if len(rows_raw) > 1:
                 header = rows_raw[0]
                 rows = [dict(zip(header, row)) for row in rows_raw[1:]]
-                result.append(rows)
+                result.append({"rows": rows})
         return result
 
     @staticmethod
@@ -1,8 +1,52 @@
-from typing import List, Any, Dict
+import asyncio
+import uuid
+from itertools import islice
+from typing import List, Any, Dict, Iterable, Iterator, Optional, Tuple
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
 from bson import ObjectId
+from loguru import logger
+from pymongo import WriteConcern
 
+from app.core.config import settings
+from app.core.metrics import FRAGMENTS, RECORDS
+from app.core.database import get_mongo_db
 from app.models import ParsedFragment
+from app.services.source_stats import SourceStatsService
+
+# Mongo collection holding the full records of each fragment type.
+FRAGMENT_COLLECTIONS = {
+    "json": "json_fragments",
+    "csv": "csv_fragments",
+    "html": "html_tables",
+    "kv": "kv_fragments",
+}
+
+# Session.info key under which fragment rows wait for FragmentSaver.flush.
+_PENDING_KEY = "pending_fragments"
+_FRAGMENT_COLUMNS = [
+    "id",
+    "file_id",
+    "fragment_type",
+    "start_offset",
+    "end_offset",
+    "record_count",
+    "preview_json",
+    "start_row",
+    "end_row",
+    "start_page",
+    "end_page",
+]
+
+# Every stored record carries its fragment_id, file_id and source_id
+# under this one reserved key, so none of the record's own fields are
+# overwritten. Neither key is part of the record's schema.
+RECORD_META_KEY = "_etl"
+RECORD_META_KEYS = ("_id", RECORD_META_KEY)
+
+# Session.info key holding the file ids whose records are in Mongo but
+# whose Postgres rows are not committed yet.
+_UNCOMMITTED_KEY = "uncommitted_record_files"
 
 
 def _clean_preview(obj: Any) -> Any:
@@ -25,12 +69,202 @@ def _clean_preview(obj: Any) -> Any:
         return obj
 
 
+def _write_concern() -> WriteConcern:
+    w = settings.MONGO_WRITE_CONCERN_W
+    return WriteConcern(w=int(w) if w.isdigit() else w, j=settings.MONGO_WRITE_CONCERN_J)
+
+
+def _tagged_records(
+    fragments: Iterable[Tuple[str, List[dict]]],
+    file_id: str,
+    source_id: Optional[str],
+) -> Iterator[dict]:
+    for fragment_id, records in fragments:
+        for record in records:
+            doc = dict(record)
+            doc[RECORD_META_KEY] = {
+                "fragment_id": fragment_id,
+                "file_id": file_id,
+                "source_id": source_id,
+            }
+            yield doc
+
+
+async def _insert_records(
+    session: AsyncSession,
+    fragment_type: str,
+    fragments: List[Tuple[str, List[dict]]],
+    file_id: str,
+    source_id: Optional[str],
+) -> None:
+    """
+    Write every record of the given fragments to the fragment type's
+    collection with batched, unordered insert_many calls. The file stays
+    marked uncommitted on the session until FragmentSaver.commit, so a
+    rollback can remove its records again.
+    """
+    if not fragments:
+        return
+    session.info.setdefault(_UNCOMMITTED_KEY, set()).add(file_id)
+    collection = get_mongo_db()[FRAGMENT_COLLECTIONS[fragment_type]].with_options(
+        write_concern=_write_concern()
+    )
+    docs = _tagged_records(fragments, file_id, source_id)
+    batch_size = max(1, settings.MONGO_INSERT_BATCH_SIZE)
+    in_flight = asyncio.Semaphore(max(1, settings.MONGO_INSERT_CONCURRENCY))
+    failed = asyncio.Event()
+    tasks = []
+
+    async def insert(batch: List[dict]) -> None:
+        try:
+            await collection.insert_many(batch, ordered=False)
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            in_flight.release()
+
+    try:
+        while not failed.is_set():
+            await in_flight.acquire()
+            batch = [] if failed.is_set() else list(islice(docs, batch_size))
+            if not batch:
+                in_flight.release()
+                break
+            tasks.append(asyncio.create_task(insert(batch)))
+    finally:
+        # Every batch already sent is waited for, failed or not. Motor
+        # cannot take back an insert once sent, so cancelling would let
+        # one land after the caller removed the file's records.
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+def _stage_fragment(session: AsyncSession, **values: Any) -> str:
+    """
+    Queue a parsed_fragments row on the session instead of adding an ORM
+    object; FragmentSaver.flush writes all queued rows in one COPY.
+    """
+    values.setdefault("id", str(uuid.uuid4()))
+    session.info.setdefault(_PENDING_KEY, []).append(values)
+    return values["id"]
+
+
 class FragmentSaver:
+    @staticmethod
+    async def flush(session: AsyncSession) -> int:
+        """
+        Write every staged fragment row with a single COPY on the
+        session's connection, inside the session's open transaction.
+        The caller commits, so the upload's UploadedFile row and its
+        fragments land together or not at all, along with the source
+        rollup counting them.
+        """
+        rows = session.info.pop(_PENDING_KEY, None)
+        if not rows:
+            await SourceStatsService.apply(session)
+            return 0
+
+        conn = await session.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            ParsedFragment.__tablename__,
+            columns=_FRAGMENT_COLUMNS,
+            records=[
+                (
+                    row["id"],
+                    row["file_id"],
+                    row["fragment_type"],
+                    row.get("start_offset"),
+                    row.get("end_offset"),
+                    row.get("record_count"),
+                    None if row.get("preview_json") is None else orjson.dumps(row["preview_json"]).decode(),
+                    row.get("start_row"),
+                    row.get("end_row"),
+                    row.get("start_page"),
+                    row.get("end_page"),
+                )
+                for row in rows
+            ],
+        )
+        for row in rows:
+            FRAGMENTS.inc(fragment_type=row["fragment_type"])
+            RECORDS.inc(row.get("record_count") or 0, fragment_type=row["fragment_type"])
+        await SourceStatsService.stage_fragments(session, rows)
+        await SourceStatsService.apply(session)
+        return len(rows)
+
+    @staticmethod
+    async def commit(session: AsyncSession) -> None:
+        """
+        Commit the session. Should the commit fail, the Mongo records of
+        the uncommitted files are removed, so no retry finds them twice.
+        """
+        try:
+            await session.commit()
+        except Exception:
+            await FragmentSaver.remove_uncommitted_records(session)
+            raise
+        session.info.pop(_UNCOMMITTED_KEY, None)
+
+    @staticmethod
+    def uncommitted_record_files(session: AsyncSession) -> frozenset:
+        return frozenset(session.info.get(_UNCOMMITTED_KEY, ()))
+
+    @staticmethod
+    async def remove_uncommitted_records(
+        session: AsyncSession, keep: frozenset = frozenset()
+    ) -> None:
+        """
+        Delete the Mongo records of files whose Postgres rows are being
+        rolled back, except the files in `keep` (a snapshot taken with
+        uncommitted_record_files before the failed work began). Failures
+        are logged: the caller is already handling an error.
+        """
+        pending = session.info.get(_UNCOMMITTED_KEY)
+        if not pending:
+            return
+        file_ids = [file_id for file_id in pending if file_id not in keep]
+        if not file_ids:
+            return
+        pending.difference_update(file_ids)
+        db = get_mongo_db()
+        try:
+            for collection in FRAGMENT_COLLECTIONS.values():
+                await db[collection].delete_many(
+                    {f"{RECORD_META_KEY}.file_id": {"$in": file_ids}}
+                )
+        except Exception as e:
+            logger.warning("Could not remove records of rolled back files {}: {!r}", file_ids, e)
+
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """
+        Index the record tags every fragment collection is read and
+        cleaned up by. create_index is a no-op for an existing index.
+        """
+        db = get_mongo_db()
+        for collection in FRAGMENT_COLLECTIONS.values():
+            for key in ("source_id", "file_id", "fragment_id"):
+                await db[collection].create_index(f"{RECORD_META_KEY}.{key}")
+
+    @staticmethod
+    def discard(session: AsyncSession) -> None:
+        """
+        Drop staged rows that will not be written, e.g. after a failed
+        member of a batch was rolled back to its savepoint.
+        """
+        session.info.pop(_PENDING_KEY, None)
+        SourceStatsService.discard(session)
+
     @staticmethod
     async def save_json_fragments(
         session: AsyncSession,
         file_id: str,
         json_blocks: List[dict],
+        source_id: Optional[str] = None,
     ) -> None:
         """
         json_blocks is a list of blocks, each something like:
@@ -41,74 +275,101 @@ class FragmentSaver:
             "records": [ {...}, {...}, ... ]   # or "data"
         }
         """
+        stored = []
         for block in json_blocks:
             records = block.get("records") or block.get("data") or []
             # Take a small preview (first few docs), clean ObjectId/_id
             preview_records = _clean_preview(records[:3])
 
-            fragment = ParsedFragment(
+            fragment_id = _stage_fragment(
+                session,
                 file_id=file_id,
                 fragment_type="json",
                 start_offset=block.get("start_offset"),
                 end_offset=block.get("end_offset"),
+                start_page=block.get("start_page"),
+                end_page=block.get("end_page"),
                 record_count=len(records) if isinstance(records, list) else block.get("record_count", 0),
                 preview_json=preview_records,
             )
-            session.add(fragment)
+            if isinstance(records, list):
+                stored.append((fragment_id, [r for r in records if isinstance(r, dict)]))
+
+        await _insert_records(session, "json", stored, file_id, source_id)
 
     @staticmethod
     async def save_text_block(
         session: AsyncSession,
         file_id: str,
         text_block: str,
+        page_offsets: Optional[List[int]] = None,
+        length: Optional[int] = None,
     ) -> None:
         """
-        Saves the unstructured text block.
+        Saves the unstructured text block. text_block may be a preview,
+        with length the full block's length. For PDFs, page_offsets holds
+        the offset at which each page starts in the text.
         """
-        fragment = ParsedFragment(
+        preview: Dict[str, Any] = {"text": text_block[:1000]}
+        if page_offsets:
+            preview["page_offsets"] = page_offsets
+
+        _stage_fragment(
+            session,
             file_id=file_id,
             fragment_type="text",
             start_offset=0,
-            end_offset=len(text_block),
+            end_offset=len(text_block) if length is None else length,
             record_count=1,
-            preview_json={"text": text_block[:1000]},
+            preview_json=preview,
         )
-        session.add(fragment)
 
     @staticmethod
     async def save_csv_blocks(
         session: AsyncSession,
         file_id: str,
         csv_blocks: List[dict],
+        source_id: Optional[str] = None,
     ) -> None:
         """
         csv_blocks is a list of blocks, each something like:
         {
             "start_offset": ...,
             "end_offset": ...,
+            "start_row": ...,   # streamed CSV only
+            "end_row": ...,
             "rows": [ {"col1": "...", "col2": "..."}, ... ]
         }
         """
+        stored = []
         for block in csv_blocks:
             rows = block.get("rows") or []
             # Clean preview rows before storing
             preview_rows = _clean_preview(rows[:3])
 
-            fragment = ParsedFragment(
+            fragment_id = _stage_fragment(
+                session,
                 file_id=file_id,
                 fragment_type="csv",
                 start_offset=block.get("start_offset"),
                 end_offset=block.get("end_offset"),
+                start_page=block.get("start_page"),
+                end_page=block.get("end_page"),
+                start_row=block.get("start_row"),
+                end_row=block.get("end_row"),
                 record_count=len(rows),
                 preview_json=preview_rows,
             )
-            session.add(fragment)
+            stored.append((fragment_id, rows))
+
+        await _insert_records(session, "csv", stored, file_id, source_id)
 
     @staticmethod
     async def save_kv_blocks(
         session: AsyncSession,
         file_id: str,
         kv_blocks: List[dict],
+        source_id: Optional[str] = None,
     ) -> None:
         """
         kv_blocks example:
@@ -118,25 +379,33 @@ class FragmentSaver:
             "pairs": { "key1": "value1", ... }
         }
         """
+        stored = []
         for block in kv_blocks:
             pairs = block.get("pairs") or {}
             preview_pairs = _clean_preview(pairs)
 
-            fragment = ParsedFragment(
+            fragment_id = _stage_fragment(
+                session,
                 file_id=file_id,
                 fragment_type="kv",
                 start_offset=block.get("start_offset"),
                 end_offset=block.get("end_offset"),
+                start_page=block.get("start_page"),
+                end_page=block.get("end_page"),
                 record_count=len(pairs) if isinstance(pairs, dict) else 0,
                 preview_json=preview_pairs,
             )
-            session.add(fragment)
+            if isinstance(pairs, dict) and pairs:
+                stored.append((fragment_id, [pairs]))
+
+        await _insert_records(session, "kv", stored, file_id, source_id)
 
     @staticmethod
     async def save_html_tables(
         session: AsyncSession,
         file_id: str,
         html_blocks: List[dict],
+        source_id: Optional[str] = None,
     ) -> None:
         """
         html_blocks example:
@@ -146,16 +415,22 @@ class FragmentSaver:
             "rows": [ {"col1": "...", "col2": "..."}, ... ]
         }
         """
+        stored = []
         for block in html_blocks:
             rows = block.get("rows") or []
             preview_rows = _clean_preview(rows[:3])
 
-            fragment = ParsedFragment(
+            fragment_id = _stage_fragment(
+                session,
                 file_id=file_id,
                 fragment_type="html",
                 start_offset=block.get("start_offset"),
                 end_offset=block.get("end_offset"),
+                start_page=block.get("start_page"),
+                end_page=block.get("end_page"),
                 record_count=len(rows),
                 preview_json=preview_rows,
             )
-            session.add(fragment)
+            stored.append((fragment_id, rows))
+
+        await _insert_records(session, "html", stored, file_id, source_id)
@@ -0,0 +1,174 @@
+from typing import Any, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.metrics import (
+    EXTRACTOR_SECONDS,
+    STAGE_SECONDS,
+    UPLOAD_BYTES,
+    UPLOADS,
+    content_type_label,
+)
+from app.services.extraction_jobs import run_extraction
+from app.services.file_service import FileService, SpooledUpload
+from app.services.fragment_saver import FragmentSaver
+from app.services.schema_inference import SchemaInferenceService
+from app.services.stream_ingest import StreamIngestService
+
+
+class IngestService:
+    """
+    The upload pipeline shared by the synchronous /upload path and the
+    ingest workers: extract a spooled payload, then persist it.
+    """
+
+    @staticmethod
+    def duplicate_response(
+        spooled: SpooledUpload, source_id: Optional[str], file_id: str
+    ) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "duplicate": True,
+            "source_id": source_id,
+            "file_id": file_id,
+            "filename": spooled.filename,
+            "content_hash": spooled.content_hash,
+        }
+
+    @staticmethod
+    async def find_duplicate(
+        session: AsyncSession, spooled: SpooledUpload, source_id: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The response for an upload the source already has, checked before
+        any extraction work is spent on it. persist checks again, for a
+        concurrent upload of the same payload.
+        """
+        existing = await FileService.find_existing(session, source_id, spooled.content_hash)
+        if existing is None:
+            return None
+        return IngestService.duplicate_response(spooled, source_id, existing.id)
+
+    @staticmethod
+    async def extract(spooled: SpooledUpload) -> Dict[str, Any]:
+        """
+        Large JSON arrays and NDJSON are not extracted up front; they are
+        parsed from the spool file while persist runs, so the payload must
+        still exist when persist is called.
+        """
+        layout = await run_in_threadpool(StreamIngestService.detect, spooled)
+        if layout is not None:
+            return {"stream": layout}
+
+        label = content_type_label(spooled.content_type)
+        with STAGE_SECONDS.time(stage="extract", content_type=label):
+            extraction = await run_extraction(spooled)
+        timings = extraction.pop("timings", {})
+        for stage, seconds in timings.get("stages", {}).items():
+            STAGE_SECONDS.observe(seconds, stage=stage, content_type=label)
+        for extractor, seconds in timings.get("extractors", {}).items():
+            EXTRACTOR_SECONDS.observe(seconds, extractor=extractor, content_type=label)
+        return extraction
+
+    @staticmethod
+    async def persist(
+        session: AsyncSession,
+        spooled: SpooledUpload,
+        source_id: Optional[str],
+        extraction: Dict[str, Any],
+        commit: bool = True,
+    ) -> Dict[str, Any]:
+        label = content_type_label(spooled.content_type)
+        committed_files = FragmentSaver.uncommitted_record_files(session)
+        try:
+            with STAGE_SECONDS.time(stage="persist", content_type=label):
+                if "stream" in extraction:
+                    response = await StreamIngestService.persist(
+                        session, spooled, source_id, extraction["stream"], commit=commit
+                    )
+                else:
+                    response = await IngestService._persist_extracted(
+                        session, spooled, source_id, extraction, commit, label
+                    )
+        except Exception:
+            # This upload's Mongo records go with its rolled back rows;
+            # records of earlier uncommitted uploads stay with theirs.
+            await FragmentSaver.remove_uncommitted_records(session, keep=committed_files)
+            UPLOADS.inc(content_type=label, status="error")
+            raise
+        if response.get("duplicate"):
+            UPLOADS.inc(content_type=label, status="duplicate")
+            return response
+        UPLOADS.inc(content_type=label, status="ok")
+        UPLOAD_BYTES.inc(spooled.size_bytes, content_type=label)
+        return response
+
+    @staticmethod
+    async def _persist_extracted(
+        session: AsyncSession,
+        spooled: SpooledUpload,
+        source_id: Optional[str],
+        extraction: Dict[str, Any],
+        commit: bool,
+        label: str,
+    ) -> Dict[str, Any]:
+        uploaded_file, created = await FileService.save_file_record(
+            session=session,
+            source_id=source_id,
+            file=spooled,
+            content_hash=spooled.content_hash,
+            text_excerpt=extraction["text_excerpt"],
+            size_bytes=spooled.size_bytes,
+        )
+        if not created:
+            return IngestService.duplicate_response(spooled, source_id, uploaded_file.id)
+
+        json_blocks = extraction["json_blocks"]
+        csv_blocks = extraction["csv_blocks"]
+        kv_blocks = extraction["kv_blocks"]
+        html_tables = extraction["html_tables"]
+        text_block = extraction["text_block"]
+
+        with STAGE_SECONDS.time(stage="save_fragments", content_type=label):
+            await FragmentSaver.save_json_fragments(session, uploaded_file.id, json_blocks, source_id)
+            await FragmentSaver.save_csv_blocks(session, uploaded_file.id, csv_blocks, source_id)
+            await FragmentSaver.save_html_tables(session, uploaded_file.id, html_tables, source_id)
+            await FragmentSaver.save_kv_blocks(session, uploaded_file.id, kv_blocks, source_id)
+            if text_block:
+                await FragmentSaver.save_text_block(
+                    session,
+                    uploaded_file.id,
+                    text_block,
+                    extraction.get("page_offsets"),
+                    extraction.get("text_block_length"),
+                )
+        if source_id:
+            with STAGE_SECONDS.time(stage="schema_state", content_type=label):
+                await SchemaInferenceService.record_upload(
+                    session,
+                    source_id,
+                    uploaded_file.id,
+                    extraction["field_stats"],
+                    extraction["doc_count"],
+                )
+        with STAGE_SECONDS.time(stage="flush", content_type=label):
+            await FragmentSaver.flush(session)
+        if commit:
+            with STAGE_SECONDS.time(stage="commit", content_type=label):
+                await FragmentSaver.commit(session)
+
+        return {
+            "status": "ok",
+            "source_id": source_id,
+            "file_id": uploaded_file.id,
+            "filename": spooled.filename,
+            "content_hash": spooled.content_hash,
+            "raw_text_length": extraction["text_length"],
+            "fragments": {
+                "json_blocks": len(json_blocks),
+                "csv_blocks": len(csv_blocks),
+                "kv_blocks": len(kv_blocks),
+                "html_tables": len(html_tables),
+                "text_block": bool(text_block),
+            },
+        }
@@ -0,0 +1,223 @@
+import os
+import shutil
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.ingest_job import IngestJob
+from app.services.file_service import SpooledUpload
+
+
+class JobQueue:
+    """
+    Ingest jobs stored in Postgres. Workers claim them with
+    SELECT ... FOR UPDATE SKIP LOCKED, so any number of worker processes
+    can drain the table without handing the same job to two of them.
+    """
+
+    @staticmethod
+    async def enqueue(
+        session: AsyncSession,
+        spooled: SpooledUpload,
+        source_id: Optional[str],
+    ) -> IngestJob:
+        job_id = str(uuid.uuid4())
+        os.makedirs(settings.INGEST_PAYLOAD_DIR, exist_ok=True)
+        payload_path = os.path.join(settings.INGEST_PAYLOAD_DIR, job_id)
+        # A rename when the upload was spooled into INGEST_PAYLOAD_DIR; a
+        # full copy across volumes otherwise, so never on the event loop.
+        await run_in_threadpool(shutil.move, spooled.path, payload_path)
+        spooled.path = payload_path
+
+        job = IngestJob(
+            id=job_id,
+            source_id=source_id,
+            filename=spooled.filename,
+            content_type=spooled.content_type,
+            size_bytes=spooled.size_bytes,
+            content_hash=spooled.content_hash,
+            payload_path=payload_path,
+            status="queued",
+            attempts=0,
+        )
+        session.add(job)
+        try:
+            await session.commit()
+        except BaseException:
+            spooled.cleanup()
+            raise
+        await session.refresh(job)
+        return job
+
+    @staticmethod
+    async def claim(session: AsyncSession) -> Optional[IngestJob]:
+        """
+        Take the next runnable job: queued and due, or running with an
+        expired lease (its worker died). Commits straight away so the row
+        lock is only held for the claim itself.
+
+        A job whose worker died on its last attempt is failed here, since
+        no worker was left to call fail: a payload that kills the worker
+        would otherwise be reclaimed forever.
+        """
+        now = func.now()
+        exhausted = and_(
+            IngestJob.status == "running",
+            IngestJob.lease_expires_at < now,
+            IngestJob.attempts >= settings.INGEST_MAX_ATTEMPTS,
+        )
+        abandoned = await session.scalars(
+            update(IngestJob)
+            .where(exhausted)
+            .values(
+                status="failed",
+                last_error="Worker lost its lease on the last attempt",
+                lease_expires_at=None,
+                finished_at=now,
+            )
+            .returning(IngestJob.payload_path)
+            .execution_options(synchronize_session=False)
+        )
+        for payload_path in abandoned.all():
+            try:
+                os.unlink(payload_path)
+            except FileNotFoundError:
+                pass
+
+        next_id = (
+            select(IngestJob.id)
+            .where(
+                or_(
+                    and_(IngestJob.status == "queued", IngestJob.run_after <= now),
+                    and_(
+                        IngestJob.status == "running",
+                        IngestJob.lease_expires_at < now,
+                        IngestJob.attempts < settings.INGEST_MAX_ATTEMPTS,
+                    ),
+                )
+            )
+            .order_by(IngestJob.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(IngestJob)
+            .where(IngestJob.id == next_id)
+            .values(
+                status="running",
+                attempts=IngestJob.attempts + 1,
+                started_at=now,
+                extracted_at=None,
+                lease_expires_at=now + timedelta(seconds=settings.INGEST_LEASE_SECONDS),
+            )
+            .returning(IngestJob)
+            .execution_options(synchronize_session=False)
+        )
+        job = (await session.scalars(stmt)).first()
+        await session.commit()
+        return job
+
+    @staticmethod
+    async def mark_extracted(session: AsyncSession, job_id: str) -> None:
+        await session.execute(
+            update(IngestJob).where(IngestJob.id == job_id).values(extracted_at=func.now())
+        )
+        await session.commit()
+
+    @staticmethod
+    def _claimed(job: IngestJob):
+        """
+        Matches the job only while it is still held by this claim. Once
+        the lease lapsed and another worker reclaimed it, attempts moved on.
+        """
+        return and_(
+            IngestJob.id == job.id,
+            IngestJob.attempts == job.attempts,
+            IngestJob.status == "running",
+        )
+
+    @staticmethod
+    async def heartbeat(session: AsyncSession, job: IngestJob) -> bool:
+        """
+        Extend the lease of a running job. Returns False once the claim
+        has been lost.
+        """
+        result = await session.execute(
+            update(IngestJob)
+            .where(JobQueue._claimed(job))
+            .values(lease_expires_at=func.now() + timedelta(seconds=settings.INGEST_LEASE_SECONDS))
+        )
+        await session.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    async def complete(session: AsyncSession, job: IngestJob, result: Dict[str, Any]) -> bool:
+        """
+        Does not commit; the worker commits together with the ingest
+        writes so a job is never recorded as done without its data.
+        Returns False if the claim was lost, in which case the caller
+        must roll back.
+        """
+        updated = await session.execute(
+            update(IngestJob)
+            .where(JobQueue._claimed(job))
+            .values(
+                status="succeeded",
+                result_json=result,
+                last_error=None,
+                lease_expires_at=None,
+                finished_at=func.now(),
+            )
+        )
+        return updated.rowcount == 1
+
+    @staticmethod
+    async def fail(session: AsyncSession, job: IngestJob, error: str) -> bool:
+        """
+        Requeue with exponential backoff, or give up after
+        INGEST_MAX_ATTEMPTS. Returns True if the job is now failed for
+        good. A lost claim is left to the worker holding it now.
+        """
+        final = job.attempts >= settings.INGEST_MAX_ATTEMPTS
+        values: Dict[str, Any] = {"last_error": error, "lease_expires_at": None}
+        if final:
+            values.update(status="failed", finished_at=func.now())
+        else:
+            delay = settings.INGEST_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            values.update(status="queued", run_after=func.now() + timedelta(seconds=delay))
+        updated = await session.execute(
+            update(IngestJob).where(JobQueue._claimed(job)).values(**values)
+        )
+        await session.commit()
+        return final and updated.rowcount == 1
+
+    @staticmethod
+    async def get(session: AsyncSession, job_id: str) -> Optional[IngestJob]:
+        return await session.get(IngestJob, job_id)
+
+    @staticmethod
+    def to_dict(job: IngestJob) -> Dict[str, Any]:
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "source_id": job.source_id,
+            "filename": job.filename,
+            "size_bytes": job.size_bytes,
+            "content_hash": job.content_hash,
+            "attempts": job.attempts,
+            "last_error": job.last_error,
+            "result": job.result_json,
+            "run_after": job.run_after,
+            "timestamps": {
+                "queued": job.created_at,
+                "started": job.started_at,
+                "extracted": job.extracted_at,
+                "finished": job.finished_at,
+            },
+        }
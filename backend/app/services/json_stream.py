@@ -0,0 +1,227 @@
+import re
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+import orjson
+
+from app.services.file_service import SpooledUpload
+
+# Same tokens as the fragment scanner, plus a string running into the end
+# of the buffer, which only means "read more" unless the stream is done.
+_TOKEN = re.compile(
+    rb'(?P<string>"[^"\\\n]*(?:\\.[^"\\\n]*)*")'
+    rb'|(?P<partial>"(?:[^"\\\n]|\\.)*(?P<lone>\\)?\Z)'
+    rb'|[{}\[\]"]'
+)
+# The rest of a string cut off by the end of the buffer: up to its closing
+# quote, a newline (it never closes), or the end of the buffer again.
+_STRING_REST = re.compile(rb'[^"\\\n]*(?:\\.[^"\\\n]*)*(?:(?P<close>")|(?P<lone>\\)?\Z)?')
+# A "}" that could close an array element: followed by "," or "]".
+_ELEMENT_END = re.compile(rb"\}(?=[ \t\r\n]*[,\]])")
+# Candidate ends tried with orjson before falling back to the tokenizer.
+_FAST_ATTEMPTS = 4
+_WHITESPACE = b" \t\r\n"
+_BOM = b"\xef\xbb\xbf"
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+# (start_offset, end_offset, record); offsets are bytes into the payload.
+Record = Tuple[int, int, dict]
+
+
+def _first_byte(fh: BinaryIO) -> Tuple[int, bytes]:
+    """
+    Offset and value of the first byte that is not whitespace or a BOM.
+    """
+    head = fh.read(4096)
+    offset = len(_BOM) if head.startswith(_BOM) else 0
+    while True:
+        stripped = head[offset:].lstrip(_WHITESPACE)
+        if stripped:
+            offset = len(head) - len(stripped)
+            return offset, stripped[:1]
+        more = fh.read(4096)
+        if not more:
+            return offset, b""
+        offset = len(head)
+        head += more
+
+
+def detect_layout(spooled: SpooledUpload, probe_bytes: int = 1024 * 1024) -> Optional[str]:
+    """
+    "array" when the payload is one top-level JSON array, "ndjson" for
+    one JSON object per line, otherwise None.
+    """
+    name = (spooled.filename or "").lower()
+    mime = (spooled.content_type or "").lower()
+    with spooled.open() as fh:
+        offset, first = _first_byte(fh)
+        if first == b"[":
+            return "array"
+        if first != b"{":
+            return None
+        if name.endswith(NDJSON_SUFFIXES) or mime in NDJSON_TYPES:
+            return "ndjson"
+
+        # Otherwise the first two non-blank lines must each be an object.
+        fh.seek(offset)
+        seen = 0
+        for line in iter(lambda: fh.readline(probe_bytes), b""):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                if not isinstance(orjson.loads(line), dict):
+                    return None
+            except orjson.JSONDecodeError:
+                return None
+            seen += 1
+            if seen == 2:
+                return "ndjson"
+    return None
+
+
+def iter_ndjson(fh: BinaryIO) -> Iterator[Record]:
+    """
+    One record per line; blank lines, lines that do not parse and lines
+    holding something other than an object are skipped.
+    """
+    offset = 0
+    for line in fh:
+        start = offset
+        offset += len(line)
+        body = line.strip()
+        if not body:
+            continue
+        try:
+            record = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(record, dict):
+            lead = len(line) - len(line.lstrip())
+            yield start + lead, start + lead + len(body), record
+
+
+def iter_json_array(fh: BinaryIO, chunk_size: int = 1024 * 1024) -> Iterator[Record]:
+    """
+    Objects that are direct elements of a top-level array, read chunk by
+    chunk. Only the current element and one chunk are held in memory.
+    Elements that are not objects, or fail to parse, are skipped.
+    """
+    offset, first = _first_byte(fh)
+    if first != b"[":
+        return
+    fh.seek(offset + 1)
+
+    buf = b""
+    base = offset + 1  # payload offset of buf[0]
+    pos = 0
+    depth = 0  # nesting below the top-level array
+    elem_start = 0
+    attempts = 0  # fast-path candidates tried for the current element
+    eof = False
+    # Payload offsets of a string cut off by the end of the buffer: its
+    # quote, and where to carry on scanning it.
+    string_start: Optional[int] = None
+    string_resume = 0
+
+    def refill(resume: int) -> bool:
+        nonlocal buf, base, pos, elem_start, eof
+        if eof:
+            return False
+        # Keep the element being read, drop everything before it.
+        keep = elem_start if depth else resume
+        buf = buf[keep:]
+        base += keep
+        pos = resume - keep
+        elem_start -= keep
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf += chunk
+        return True
+
+    while True:
+        if depth == 1 and attempts < _FAST_ATTEMPTS:
+            # Fast path for an object element: a prefix of it ending in "}"
+            # that parses is the whole element, so try orjson on the next
+            # few candidate ends instead of walking every token.
+            m = _ELEMENT_END.search(buf, pos)
+            if m is None:
+                # Only a "}" trailed by nothing but whitespace can still
+                # match once more is read; resume there, not at pos.
+                tail = buf.rfind(b"}", pos)
+                if not refill(len(buf) if tail < 0 else tail):
+                    attempts = _FAST_ATTEMPTS
+                continue
+            attempts += 1
+            try:
+                record = orjson.loads(buf[elem_start:m.end()])
+            except orjson.JSONDecodeError:
+                pos = m.end()
+                continue
+            depth = 0
+            pos = m.end()
+            yield base + elem_start, base + pos, record
+            continue
+        if depth == 1 and attempts == _FAST_ATTEMPTS:
+            attempts += 1
+            pos = elem_start + 1  # rescan the element token by token
+
+        if string_start is not None:
+            m = _STRING_REST.match(buf, string_resume - base)
+            if m.group("close") is not None:
+                string_start = None
+                pos = m.end()
+                continue
+            if m.end() == len(buf) and not eof:
+                string_resume = base + (m.start("lone") if m.group("lone") is not None else m.end())
+                refill(string_start - base)
+                continue
+            # It never closes on its line; rescan after the quote.
+            pos = string_start - base + 1
+            string_start = None
+            continue
+
+        m = _TOKEN.search(buf, pos)
+        if m is None:
+            if not refill(len(buf)):
+                return
+            continue
+        if m.group("partial") is not None and not eof:
+            # Carry on from where this read stopped instead of rescanning
+            # the string from its quote after every refill.
+            string_start = base + m.start()
+            string_resume = base + (m.start("lone") if m.group("lone") is not None else m.end())
+            refill(m.start())
+            continue
+
+        i = m.start()
+        pos = m.end()
+        if m.group("string") is not None:
+            continue
+        ch = buf[i]
+        if ch == 0x22:
+            pos = i + 1  # a quote that never closes on its line
+            continue
+
+        if ch in (0x7B, 0x5B):  # { [
+            if depth == 0:
+                elem_start = i
+                attempts = 0 if ch == 0x7B else _FAST_ATTEMPTS + 1
+            depth += 1
+            continue
+
+        if depth == 0:
+            if ch == 0x5D:  # ]
+                return  # end of the top-level array
+            continue
+
+        depth -= 1
+        if depth == 0:
+            try:
+                record = orjson.loads(buf[elem_start:pos])
+            except orjson.JSONDecodeError:
+                continue
+            if isinstance(record, dict):
+                yield base + elem_start, base + pos, record
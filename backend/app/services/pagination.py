@@ -0,0 +1,38 @@
+import base64
+import datetime
+from typing import Any, List, Sequence
+
+import orjson
+
+# Response header carrying the cursor of the next page; absent on the last.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Opaque cursor for the sort key of the last row of a page. Datetimes
+    are kept as ISO strings with their offset.
+    """
+    raw = orjson.dumps(list(values))
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, arity: int) -> List[Any]:
+    """
+    Inverse of encode_cursor. Raises ValueError for anything that is not
+    a cursor of `arity` values.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = orjson.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, orjson.JSONDecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != arity:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def decode_timestamp(value: Any) -> datetime.datetime:
+    if not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    return datetime.datetime.fromisoformat(value)
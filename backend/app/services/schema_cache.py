@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import asyncpg
+import orjson
+from loguru import logger
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# (source_id, endpoint) -> (expires_at, etag, body)
+CacheKey = Tuple[str, str]
+CacheEntry = Tuple[float, str, bytes]
+
+# Session.info key holding the sources published in the open transaction.
+_PUBLISHED_KEY = "schema_cache_published"
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def encode_body(payload: Any) -> bytes:
+    return orjson.dumps(payload)
+
+
+class SchemaCache:
+    """
+    Serialized responses of the read-only schema endpoints, per source,
+    in a bounded LRU with a TTL. New versions are announced with NOTIFY
+    on SCHEMA_CACHE_CHANNEL in the transaction that writes them, and
+    every worker drops the source's entries when the notification
+    arrives. While this worker is not listening, for example while the
+    listener reconnects, the cache is bypassed rather than risk serving
+    a schema another worker has replaced.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.listening = False
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        # Bumped on every invalidation, so a response read from the
+        # database before the invalidation is not stored after it.
+        self._generations: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "invalidations": 0,
+        }
+
+    def generation(self, source_id: str) -> int:
+        return self._generations.get(source_id, 0)
+
+    def get(self, source_id: str, endpoint: str) -> Optional[Tuple[str, bytes]]:
+        if not self.listening:
+            self.counters["bypassed"] += 1
+            return None
+        key = (source_id, endpoint)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.counters["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters["hits"] += 1
+        return entry[1], entry[2]
+
+    def put(self, source_id: str, endpoint: str, generation: int, etag: str, body: bytes) -> None:
+        if not self.listening or generation != self.generation(source_id):
+            return
+        key = (source_id, endpoint)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, etag, body)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, source_id: str) -> None:
+        self._generations[source_id] = self.generation(source_id) + 1
+        for key in [k for k in self._entries if k[0] == source_id]:
+            del self._entries[key]
+        self.counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        for source_id in {k[0] for k in self._entries}:
+            self._generations[source_id] = self.generation(source_id) + 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "listening": self.listening,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    @staticmethod
+    async def publish(session: AsyncSession, source_id: str) -> None:
+        """
+        Queue an invalidation for source_id. Postgres delivers it to every
+        listener when the session's transaction commits, and drops it if
+        the transaction rolls back. This worker's own entries are dropped
+        as the commit returns, not when its notification comes back.
+        """
+        await session.execute(select(func.pg_notify(settings.SCHEMA_CACHE_CHANNEL, source_id)))
+        session.info.setdefault(_PUBLISHED_KEY, set()).add(source_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_published(session: Session) -> None:
+    published = session.info.pop(_PUBLISHED_KEY, None)
+    cache = _schema_cache
+    if published and cache is not None:
+        for source_id in published:
+            cache.invalidate(source_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_published(session: Session) -> None:
+    session.info.pop(_PUBLISHED_KEY, None)
+
+
+class SchemaCacheListener:
+    """
+    Holds a dedicated asyncpg connection LISTENing on the invalidation
+    channel and reconnects when it drops. The cache only serves entries
+    while the connection is up.
+    """
+
+    def __init__(self, cache: SchemaCache):
+        self.cache = cache
+        self._task: Optional[asyncio.Task] = None
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self.cache.invalidate(payload)
+
+    async def _run(self) -> None:
+        while True:
+            lost = asyncio.Event()
+            conn = None
+            try:
+                conn = await asyncpg.connect(
+                    user=settings.POSTGRES_USER,
+                    password=settings.POSTGRES_PASSWORD,
+                    database=settings.POSTGRES_DB,
+                    host=settings.POSTGRES_HOST,
+                    port=settings.POSTGRES_PORT,
+                )
+                conn.add_termination_listener(lambda _conn: lost.set())
+                await conn.add_listener(settings.SCHEMA_CACHE_CHANNEL, self._on_notify)
+                # Anything cached before this point may have missed a
+                # notification.
+                self.cache.clear()
+                self.cache.listening = True
+                await lost.wait()
+                logger.warning("Schema cache listener lost its connection")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Schema cache listener failed to connect: {!r}", e)
+            finally:
+                self.cache.listening = False
+                self.cache.clear()
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(settings.SCHEMA_CACHE_RECONNECT_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_schema_cache: Optional[SchemaCache] = None
+_listener: Optional[SchemaCacheListener] = None
+
+
+def get_schema_cache() -> Optional[SchemaCache]:
+    global _schema_cache
+    if _schema_cache is None and settings.SCHEMA_CACHE_ENABLED:
+        _schema_cache = SchemaCache(
+            settings.SCHEMA_CACHE_MAX_ENTRIES, settings.SCHEMA_CACHE_TTL_SECONDS
+        )
+    return _schema_cache
+
+
+def start_schema_cache_listener() -> None:
+    global _listener
+    cache = get_schema_cache()
+    if cache is not None and _listener is None:
+        _listener = SchemaCacheListener(cache)
+        _listener.start()
+
+
+async def stop_schema_cache_listener() -> None:
+    global _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
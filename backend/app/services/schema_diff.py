@@ -1,40 +1,134 @@
+import hashlib
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+import orjson
+
+from app.services.column_inference import ITEMS, child_path
+
+# Schema node layout, as written by SchemaInferenceService.finalize_schema:
+# {"types": [...], "null_ratio": r, "hash": h,
+#  "fields": {key: node, ...},   # when the field holds objects
+#  "items": node}                # when the field holds arrays
+# A schema is the field map of the top-level object.
+
+
+def _node_hash(node: Dict[str, Any]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update("|".join(sorted(node.get("types", []))).encode())
+    fields = node.get("fields")
+    if fields:
+        h.update(SchemaDiffService.fields_hash(fields).encode())
+    items = node.get("items")
+    if items:
+        h.update(b"[]" + SchemaDiffService.ensure_hash(items).encode())
+    return h.hexdigest()
 
 
 class SchemaDiffService:
     @staticmethod
     def _parse_schema(schema_json: str) -> Dict[str, Any]:
         try:
-            return json.loads(schema_json)
+            return orjson.loads(schema_json)
         except Exception:
             return {}
 
     @staticmethod
-    def diff(schema_json_old: str, schema_json_new: str) -> Dict[str, Any]:
-        old = SchemaDiffService._parse_schema(schema_json_old)
-        new = SchemaDiffService._parse_schema(schema_json_new)
+    def ensure_hash(node: Dict[str, Any]) -> str:
+        """
+        Merkle hash of a node's types and, recursively, its children.
+        Null ratios are left out so only structural drift changes it.
+        Stored on the node; schemas written before hashing get theirs here.
+        """
+        if "hash" not in node:
+            node["hash"] = _node_hash(node)
+        return node["hash"]
+
+    @staticmethod
+    def fields_hash(fields: Dict[str, Any]) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        for key in sorted(fields):
+            h.update(json.dumps(key).encode())
+            h.update(SchemaDiffService.ensure_hash(fields[key]).encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def fingerprint(schema: Dict[str, Any]) -> str:
+        """
+        Canonical fingerprint of a schema: the Merkle hash of its top-level
+        field map. Equal fingerprints mean the same paths with the same
+        types; null ratios do not count.
+        """
+        return SchemaDiffService.fields_hash(schema)
 
-        old_fields = set(old.keys())
-        new_fields = set(new.keys())
+    @staticmethod
+    def fingerprint_json(schema_json: str) -> str:
+        return SchemaDiffService.fingerprint(SchemaDiffService._parse_schema(schema_json))
+
+    @staticmethod
+    def _paths(node: Dict[str, Any], path: str, out: List[str]) -> None:
+        out.append(path)
+        for key, child in (node.get("fields") or {}).items():
+            SchemaDiffService._paths(child, child_path(path, key), out)
+        if node.get("items"):
+            SchemaDiffService._paths(node["items"], path + ITEMS, out)
 
-        added_fields = sorted(list(new_fields - old_fields))
-        removed_fields = sorted(list(old_fields - new_fields))
-        common_fields = old_fields & new_fields
+    @staticmethod
+    def _diff_fields(
+        old: Dict[str, Any], new: Dict[str, Any], prefix: str, result: Dict[str, Any]
+    ) -> None:
+        for key in new.keys() - old.keys():
+            SchemaDiffService._paths(new[key], child_path(prefix, key), result["added_fields"])
+        for key in old.keys() - new.keys():
+            SchemaDiffService._paths(old[key], child_path(prefix, key), result["removed_fields"])
+        for key in old.keys() & new.keys():
+            if SchemaDiffService.ensure_hash(old[key]) != SchemaDiffService.ensure_hash(new[key]):
+                SchemaDiffService._diff_node(old[key], new[key], child_path(prefix, key), result)
+
+    @staticmethod
+    def _diff_node(
+        old: Dict[str, Any], new: Dict[str, Any], path: str, result: Dict[str, Any]
+    ) -> None:
+        old_types = sorted(old.get("types", []))
+        new_types = sorted(new.get("types", []))
+        if old_types != new_types:
+            result["changed_fields"][path] = {
+                "old_types": old_types,
+                "new_types": new_types,
+            }
 
-        changed_fields = {}
+        SchemaDiffService._diff_fields(old.get("fields") or {}, new.get("fields") or {}, path, result)
 
-        for field in common_fields:
-            old_types = sorted(old.get(field, {}).get("types", []))
-            new_types = sorted(new.get(field, {}).get("types", []))
-            if old_types != new_types:
-                changed_fields[field] = {
-                    "old_types": old_types,
-                    "new_types": new_types,
-                }
+        old_items: Optional[Dict[str, Any]] = old.get("items")
+        new_items: Optional[Dict[str, Any]] = new.get("items")
+        if old_items and new_items:
+            if SchemaDiffService.ensure_hash(old_items) != SchemaDiffService.ensure_hash(new_items):
+                SchemaDiffService._diff_node(old_items, new_items, path + ITEMS, result)
+        elif new_items:
+            SchemaDiffService._paths(new_items, path + ITEMS, result["added_fields"])
+        elif old_items:
+            SchemaDiffService._paths(old_items, path + ITEMS, result["removed_fields"])
 
-        return {
-            "added_fields": added_fields,
-            "removed_fields": removed_fields,
-            "changed_fields": changed_fields,
+    @staticmethod
+    def diff_schemas(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Path-addressed diff of two schemas. Subtrees with equal hashes are
+        skipped without being walked, so the cost follows the number of
+        changed paths rather than the size of the schemas.
+        """
+        result: Dict[str, Any] = {
+            "added_fields": [],
+            "removed_fields": [],
+            "changed_fields": {},
         }
+        SchemaDiffService._diff_fields(old, new, "", result)
+        result["added_fields"].sort()
+        result["removed_fields"].sort()
+        result["changed_fields"] = dict(sorted(result["changed_fields"].items()))
+        return result
+
+    @staticmethod
+    def diff(schema_json_old: str, schema_json_new: str) -> Dict[str, Any]:
+        old = SchemaDiffService._parse_schema(schema_json_old)
+        new = SchemaDiffService._parse_schema(schema_json_new)
+        return SchemaDiffService.diff_schemas(old, new)
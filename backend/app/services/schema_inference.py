@@ -1,103 +1,411 @@
 import json
-from typing import Dict, Any, List
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func
+from sqlalchemy.orm import defer
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models.uploaded_file import UploadedFile
 from app.models.parsed_fragment import ParsedFragment
 from app.models.schema_version import SchemaVersion
+from app.models.schema_state import SchemaState
+from app.core.config import settings
 from app.core.database import get_mongo_db
+from app.services.column_inference import (
+    classify_value,
+    infer_columns,
+    null_ratio,
+    split_path,
+)
+from app.services.schema_cache import SchemaCache
+from app.services.schema_diff import SchemaDiffService
+from app.services.source_stats import SourceStatsService
+from app.services.fragment_saver import FRAGMENT_COLLECTIONS, RECORD_META_KEY, RECORD_META_KEYS
+
+SCAN_MODES = ("full", "reservoir", "stratified", "convergence")
+SAMPLING_MODES = ("incremental",) + SCAN_MODES
 
 
 class SchemaInferenceService:
     @staticmethod
     def infer_type(value: Any) -> str:
-        if value is None:
-            return "null"
-        if isinstance(value, bool):
-            return "boolean"
-        if isinstance(value, (int, float)):
-            return "number"
-        if isinstance(value, dict):
-            return "object"
-        if isinstance(value, list):
-            return "array"
-        return "string"
+        return classify_value(value)
+
+    @staticmethod
+    def infer_batch(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Field stats for a batch of records, classified column by column.
+        Same result as merge_field_types over each record, much faster.
+        """
+        return infer_columns(records)
 
     @staticmethod
     def merge_field_types(existing: Dict[str, Any], new_doc: Dict[str, Any]) -> None:
-        for key, value in new_doc.items():
-            t = SchemaInferenceService.infer_type(value)
-            if key not in existing:
-                existing[key] = {"types": set([t])}
-            else:
-                existing[key]["types"].add(t)
+        """
+        Fold one document into a path -> {"types": {type: count}, "count": n}
+        map. The map is JSON-serializable so it can be persisted as the
+        source's running schema state.
+        """
+        SchemaInferenceService.merge_field_stats(existing, infer_columns([new_doc]))
+
+    @staticmethod
+    def merge_field_stats(existing: Dict[str, Any], delta: Dict[str, Any]) -> None:
+        for key, meta in delta.items():
+            current = existing.get(key)
+            if current is None:
+                existing[key] = {"types": dict(meta["types"]), "count": meta["count"]}
+                continue
+            for t, n in meta["types"].items():
+                current["types"][t] = current["types"].get(t, 0) + n
+            current["count"] += meta["count"]
+
+    @staticmethod
+    async def lock_state(session: AsyncSession, source_id: str) -> None:
+        """
+        Transaction-scoped advisory lock on the source's running state.
+        Unlike a row lock it also works before the state row exists, so
+        an upload cannot slip in between a seed scan and the seed insert.
+        """
+        await session.execute(
+            select(func.pg_advisory_xact_lock(func.hashtext(f"schema_state:{source_id}")))
+        )
+
+    @staticmethod
+    async def update_state(
+        session: AsyncSession,
+        source_id: str,
+        field_stats: Dict[str, Any],
+        doc_count: int,
+        create: bool = True,
+    ) -> None:
+        """
+        Fold field stats into the source's running state. The row lock
+        serializes concurrent writers for the same source.
+        """
+        stmt = (
+            select(SchemaState)
+            .where(SchemaState.source_id == source_id)
+            .with_for_update()
+        )
+        state = (await session.execute(stmt)).scalars().first()
+        if state is None:
+            if not create:
+                return
+            await session.execute(
+                pg_insert(SchemaState)
+                .values(id=str(uuid.uuid4()), source_id=source_id, fields_json={}, doc_count=0)
+                .on_conflict_do_nothing(index_elements=[SchemaState.source_id])
+            )
+            state = (await session.execute(stmt)).scalars().one()
+
+        # Merged in place, so the JSON column cannot see the change itself.
+        fields = state.fields_json if state.fields_json is not None else {}
+        SchemaInferenceService.merge_field_stats(fields, field_stats)
+        state.fields_json = fields
+        flag_modified(state, "fields_json")
+        state.doc_count = (state.doc_count or 0) + doc_count
+
+    @staticmethod
+    async def record_upload(
+        session: AsyncSession,
+        source_id: str,
+        file_id: str,
+        field_stats: Dict[str, Any],
+        doc_count: int,
+    ) -> None:
+        """
+        Called in the upload's transaction. A source whose earlier files
+        predate the running state gets no state here; the next
+        infer_for_source call seeds it from a full scan. The state lock is
+        held until the upload commits, so a seed scan either sees this
+        upload's records or runs after it and is seen by it.
+        """
+        await SchemaInferenceService.lock_state(session, source_id)
+        stmt_other = (
+            select(UploadedFile.id)
+            .where(UploadedFile.source_id == source_id, UploadedFile.id != file_id)
+            .limit(1)
+        )
+        has_history = (await session.execute(stmt_other)).first() is not None
+        await SchemaInferenceService.update_state(
+            session, source_id, field_stats, doc_count, create=not has_history
+        )
 
     @staticmethod
     def finalize_schema(fields: Dict[str, Any]) -> Dict[str, Any]:
-        result = {}
-        for key, meta in fields.items():
-            types = sorted(list(meta["types"]))
-            result[key] = {"types": types}
+        """
+        Turn path -> stats into the nested schema tree: each node has its
+        types, null ratio and subtree hash, plus "fields" for object
+        members and "items" for array elements.
+        """
+        result: Dict[str, Any] = {}
+        parsed = [(split_path(path), meta) for path, meta in fields.items() if path]
+        # Sorted by length, a parent is always placed before its children.
+        parsed.sort(key=lambda item: len(item[0]))
+        for parts, meta in parsed:
+            parent: Optional[Dict[str, Any]] = None
+            for part in parts[:-1]:
+                if part is None:
+                    parent = parent.get("items") if parent else None
+                else:
+                    parent = (result if parent is None else parent.get("fields", {})).get(part)
+                if parent is None:
+                    break
+            else:
+                entry = {
+                    "types": sorted(list(meta["types"])),
+                    "null_ratio": round(null_ratio(meta), 4),
+                }
+                if parts[-1] is None:
+                    if parent is not None:
+                        parent["items"] = entry
+                elif parent is None:
+                    result[parts[-1]] = entry
+                else:
+                    parent.setdefault("fields", {})[parts[-1]] = entry
+
+        for node in result.values():
+            SchemaDiffService.ensure_hash(node)
         return result
 
     @staticmethod
-    async def infer_for_source(session: AsyncSession, source_id: str) -> SchemaVersion:
-        mongo = get_mongo_db()
+    async def _fragment_types(session: AsyncSession, source_id: str) -> List[str]:
+        """
+        The fragment types holding records of the source, so collections
+        it has nothing in are not read.
+        """
+        stmt_types = (
+            select(ParsedFragment.fragment_type)
+            .join(UploadedFile, UploadedFile.id == ParsedFragment.file_id)
+            .where(
+                UploadedFile.source_id == source_id,
+                ParsedFragment.fragment_type.in_(list(FRAGMENT_COLLECTIONS)),
+            )
+            .distinct()
+        )
+        fragment_types = sorted((await session.execute(stmt_types)).scalars().all())
 
-        stmt_files = select(UploadedFile.id).where(UploadedFile.source_id == source_id)
-        result_files = await session.execute(stmt_files)
-        file_ids = [row[0] for row in result_files.all()]
-        if not file_ids:
-            raise ValueError("No files for this source_id")
+        if not fragment_types:
+            stmt_files = select(UploadedFile.id).where(UploadedFile.source_id == source_id).limit(1)
+            if (await session.execute(stmt_files)).first() is None:
+                raise ValueError("No files for this source_id")
+        return fragment_types
 
-        stmt_frags = select(ParsedFragment).where(
-            ParsedFragment.file_id.in_(file_ids)
-        )
-        result_frags = await session.execute(stmt_frags)
-        frags: List[ParsedFragment] = result_frags.scalars().all()
+    @staticmethod
+    def _union_pipeline(
+        source_id: str, fragment_types: List[str]
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        One pipeline reading the source's records from every fragment
+        collection. Returns the collection to run it on and its stages.
+        """
+        match = {"$match": {f"{RECORD_META_KEY}.source_id": source_id}}
+        first_type, *rest = fragment_types
+        stages: List[Dict[str, Any]] = [match]
+        for fragment_type in rest:
+            stages.append(
+                {
+                    "$unionWith": {
+                        "coll": FRAGMENT_COLLECTIONS[fragment_type],
+                        "pipeline": [match],
+                    }
+                }
+            )
+        return FRAGMENT_COLLECTIONS[first_type], stages
+
+    @staticmethod
+    async def _scan(collection: Any, stages: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+        """
+        Field stats of every record the stages yield. Records go through
+        infer_columns a batch at a time, so nested paths (a.b, tags[])
+        come out exactly as on upload and every mode agrees on a schema.
+        """
+        fields: Dict[str, Any] = {}
+        examined = 0
+        batch_size = max(1, settings.SCHEMA_SCAN_BATCH_SIZE)
+        batch: List[Dict[str, Any]] = []
+        async for doc in collection.aggregate(stages, batchSize=batch_size):
+            for key in RECORD_META_KEYS:
+                doc.pop(key, None)
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                SchemaInferenceService.merge_field_stats(fields, infer_columns(batch))
+                examined += len(batch)
+                batch = []
+        if batch:
+            SchemaInferenceService.merge_field_stats(fields, infer_columns(batch))
+            examined += len(batch)
+        return fields, examined
 
+    @staticmethod
+    async def _converge(
+        collection: Any, stages: List[Dict[str, Any]], patience: int
+    ) -> Tuple[Dict[str, Any], int]:
+        """
+        Stream records until `patience` consecutive documents add no new
+        path and no new type at an existing path, nested ones included.
+        """
         fields: Dict[str, Any] = {}
+        examined = 0
+        since_new = 0
+        cursor = collection.aggregate(stages)
+        try:
+            async for doc in cursor:
+                for key in RECORD_META_KEYS:
+                    doc.pop(key, None)
+                examined += 1
+                delta = infer_columns([doc])
+                novel = any(
+                    path not in fields or not meta["types"].keys() <= fields[path]["types"].keys()
+                    for path, meta in delta.items()
+                )
+                SchemaInferenceService.merge_field_stats(fields, delta)
+                since_new = 0 if novel else since_new + 1
+                if since_new >= patience:
+                    break
+        finally:
+            await cursor.close()
+        return fields, examined
+
+    @staticmethod
+    async def sample_source(
+        session: AsyncSession,
+        source_id: str,
+        mode: str = "full",
+        budget: Optional[int] = None,
+        per_file: Optional[int] = None,
+        patience: Optional[int] = None,
+    ) -> Tuple[Dict[str, Any], int]:
+        """
+        Field stats from the source's stored records, and the number of
+        documents examined to get them.
+
+        full        every record
+        reservoir   a uniform random sample of `budget` records per source
+        stratified  the first `per_file` records of every file
+        convergence records until `patience` in a row add nothing new
+        """
+        if mode not in SCAN_MODES:
+            raise ValueError(f"Unknown sampling mode: {mode}")
+
+        fragment_types = await SchemaInferenceService._fragment_types(session, source_id)
+        if not fragment_types:
+            return {}, 0
+
+        collection_name, stages = SchemaInferenceService._union_pipeline(
+            source_id, fragment_types
+        )
+        collection = get_mongo_db()[collection_name]
 
-        for frag in frags:
-            if frag.fragment_type == "json":
-                cursor = mongo.json_fragments.find({"fragment_id": frag.id}).limit(50)
-                async for doc in cursor:
-                    doc.pop("_id", None)
-                    SchemaInferenceService.merge_field_types(fields, doc)
-            elif frag.fragment_type == "csv":
-                cursor = mongo.csv_fragments.find({"fragment_id": frag.id}).limit(50)
-                async for doc in cursor:
-                    doc.pop("_id", None)
-                    SchemaInferenceService.merge_field_types(fields, doc)
-            elif frag.fragment_type == "html":
-                cursor = mongo.html_tables.find({"fragment_id": frag.id}).limit(50)
-                async for doc in cursor:
-                    doc.pop("_id", None)
-                    SchemaInferenceService.merge_field_types(fields, doc)
-            elif frag.fragment_type == "kv":
-                cursor = mongo.kv_fragments.find({"fragment_id": frag.id}).limit(50)
-                async for doc in cursor:
-                    doc.pop("_id", None)
-                    SchemaInferenceService.merge_field_types(fields, doc)
+        if mode == "convergence":
+            patience = patience or settings.SCHEMA_CONVERGENCE_PATIENCE
+            return await SchemaInferenceService._converge(collection, stages, patience)
+
+        if mode == "reservoir":
+            budget = budget or settings.SCHEMA_SAMPLE_BUDGET
+            stages = stages + [{"$sample": {"size": budget}}]
+        elif mode == "stratified":
+            per_file = per_file or settings.SCHEMA_SAMPLE_PER_FILE
+            stages = stages + [
+                {
+                    "$group": {
+                        "_id": f"${RECORD_META_KEY}.file_id",
+                        "docs": {"$firstN": {"input": "$$ROOT", "n": per_file}},
+                    }
+                },
+                {"$unwind": "$docs"},
+                {"$replaceRoot": {"newRoot": "$docs"}},
+            ]
+
+        return await SchemaInferenceService._scan(collection, stages)
+
+    @staticmethod
+    async def scan_source(session: AsyncSession, source_id: str) -> Dict[str, Any]:
+        """
+        Rebuild field stats from every stored record of the source. Only
+        needed for sources ingested before the running schema state existed.
+        """
+        fields, _ = await SchemaInferenceService.sample_source(session, source_id, "full")
+        return fields
+
+    @staticmethod
+    async def infer_for_source(
+        session: AsyncSession,
+        source_id: str,
+        sampling: str = "incremental",
+        budget: Optional[int] = None,
+        per_file: Optional[int] = None,
+        patience: Optional[int] = None,
+    ) -> Tuple[SchemaVersion, Dict[str, Any]]:
+        """
+        "incremental" reads the running schema state; the scan modes of
+        sample_source read the stored records instead and leave the state
+        untouched. Returns the new version and a sampling report; when
+        the schema's fingerprint matches the latest version, that version
+        is returned instead of a duplicate.
+        """
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode: {sampling}")
+
+        examined = 0
+        if sampling == "incremental":
+            stmt_state = select(SchemaState.fields_json).where(SchemaState.source_id == source_id)
+            fields = (await session.execute(stmt_state)).scalar_one_or_none()
+            if fields is None:
+                # Uploads wait on the lock until the seed is committed, so
+                # none lands between the scan and the seed.
+                await SchemaInferenceService.lock_state(session, source_id)
+                fields = (await session.execute(stmt_state)).scalar_one_or_none()
+            if fields is None:
+                fields, examined = await SchemaInferenceService.sample_source(
+                    session, source_id, "full"
+                )
+                # Seed the running state so later calls skip the scan.
+                await SchemaInferenceService.update_state(session, source_id, fields, examined)
+                await session.commit()
+        else:
+            fields, examined = await SchemaInferenceService.sample_source(
+                session, source_id, sampling, budget, per_file, patience
+            )
+        report = {"mode": sampling, "documents_examined": examined}
 
         schema_dict = SchemaInferenceService.finalize_schema(fields)
-        schema_json = json.dumps(schema_dict)
+        fingerprint = SchemaDiffService.fingerprint(schema_dict)
 
+        # Fingerprint lookups never need schema_json; only load it if the
+        # latest version predates fingerprints.
         stmt_latest = (
             select(SchemaVersion)
+            .options(defer(SchemaVersion.schema_json))
             .where(SchemaVersion.source_id == source_id)
             .order_by(desc(SchemaVersion.version))
+            .limit(1)
         )
-        result_latest = await session.execute(stmt_latest)
-        latest = result_latest.scalars().first()
-        next_version = 1 if latest is None else latest.version + 1
+        latest = (await session.execute(stmt_latest)).scalars().first()
+        if latest is not None and latest.fingerprint is None:
+            await session.refresh(latest, ["schema_json"])
+            latest.fingerprint = SchemaDiffService.fingerprint_json(latest.schema_json)
+            await SchemaCache.publish(session, source_id)
+            await session.commit()
 
+        if latest is not None and latest.fingerprint == fingerprint:
+            # The caller returns the schema, so it is loaded after all.
+            await session.refresh(latest, ["schema_json"])
+            report["reused"] = True
+            return latest, report
+
+        next_version = 1 if latest is None else latest.version + 1
         schema_row = SchemaVersion(
             source_id=source_id,
             version=next_version,
-            schema_json=schema_json,
+            schema_json=json.dumps(schema_dict),
+            fingerprint=fingerprint,
         )
         session.add(schema_row)
+        await SourceStatsService.set_schema_version(session, source_id, next_version)
+        await SchemaCache.publish(session, source_id)
         await session.commit()
         await session.refresh(schema_row)
-        return schema_row
+        report["reused"] = False
+        return schema_row, report
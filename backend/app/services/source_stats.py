@@ -0,0 +1,98 @@
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.models.source import Source
+from app.models.uploaded_file import UploadedFile
+
+# Session.info key under which per-source deltas wait for apply().
+_PENDING_KEY = "pending_source_stats"
+
+
+def _pending(session: AsyncSession, source_id: str) -> Dict[str, Any]:
+    return session.info.setdefault(_PENDING_KEY, {}).setdefault(
+        source_id, {"files": 0, "bytes": 0, "fragments": Counter()}
+    )
+
+
+class SourceStatsService:
+    """
+    Maintains the sources rollup. Ingest stages deltas on the session as
+    rows are written; apply() folds them into each source's row under a
+    row lock, in the same transaction, so the rollup commits or rolls
+    back with the rows it counts.
+    """
+
+    @staticmethod
+    def stage_file(session: AsyncSession, source_id: Optional[str], size_bytes: Optional[int]) -> None:
+        if not source_id:
+            return
+        delta = _pending(session, source_id)
+        delta["files"] += 1
+        delta["bytes"] += size_bytes or 0
+
+    @staticmethod
+    async def stage_fragments(session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        by_file: Dict[str, Counter] = {}
+        for row in rows:
+            by_file.setdefault(row["file_id"], Counter())[row["fragment_type"]] += 1
+        stmt = select(UploadedFile.id, UploadedFile.source_id).where(
+            UploadedFile.id.in_(list(by_file)),
+            UploadedFile.source_id.is_not(None),
+        )
+        for file_id, source_id in (await session.execute(stmt)).all():
+            _pending(session, source_id)["fragments"].update(by_file[file_id])
+
+    @staticmethod
+    def discard(session: AsyncSession) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+    @staticmethod
+    async def _locked(session: AsyncSession, source_id: str) -> Source:
+        stmt = select(Source).where(Source.source_id == source_id).with_for_update()
+        source = (await session.execute(stmt)).scalars().first()
+        if source is None:
+            await session.execute(
+                pg_insert(Source)
+                .values(
+                    id=str(uuid.uuid4()),
+                    source_id=source_id,
+                    file_count=0,
+                    total_bytes=0,
+                    fragment_counts={},
+                )
+                .on_conflict_do_nothing(index_elements=[Source.source_id])
+            )
+            source = (await session.execute(stmt)).scalars().one()
+        return source
+
+    @staticmethod
+    async def apply(session: AsyncSession) -> None:
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        # Sources are locked in a fixed order so concurrent uploads
+        # touching several sources cannot deadlock.
+        for source_id in sorted(pending):
+            delta = pending[source_id]
+            source = await SourceStatsService._locked(session, source_id)
+            source.file_count = (source.file_count or 0) + delta["files"]
+            source.total_bytes = (source.total_bytes or 0) + delta["bytes"]
+            if delta["fragments"]:
+                counts = dict(source.fragment_counts or {})
+                for fragment_type, n in delta["fragments"].items():
+                    counts[fragment_type] = counts.get(fragment_type, 0) + n
+                source.fragment_counts = counts
+            if delta["files"]:
+                source.last_upload_at = func.now()
+
+    @staticmethod
+    async def set_schema_version(session: AsyncSession, source_id: str, version: int) -> None:
+        source = await SourceStatsService._locked(session, source_id)
+        if source.latest_schema_version is None or version > source.latest_schema_version:
+            source.latest_schema_version = version
@@ -0,0 +1,81 @@
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import orjson
+from loguru import logger
+
+from app.core.config import settings
+
+
+class TextCache:
+    """
+    On-disk cache of extracted text keyed by content hash. Entries are
+    written atomically, so every API and worker process on the host can
+    share the same directory. A hit touches the entry's mtime, and writes
+    evict the least recently used entries beyond TEXT_CACHE_MAX_BYTES.
+    Both block on file I/O and parsing, so call them off the event loop.
+    """
+
+    @staticmethod
+    def _path(content_hash: str) -> str:
+        return os.path.join(settings.TEXT_CACHE_DIR, f"{content_hash}.json")
+
+    @staticmethod
+    def get(content_hash: str) -> Optional[Dict[str, Any]]:
+        path = TextCache._path(content_hash)
+        try:
+            with open(path, "rb") as fh:
+                entry = orjson.loads(fh.read())
+            os.utime(path)
+            return entry
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def put(content_hash: str, text: str, page_offsets: List[int]) -> None:
+        """
+        Best effort: a failed write is logged, never raised.
+        """
+        body = orjson.dumps({"text": text, "page_offsets": page_offsets})
+        if len(body) > settings.TEXT_CACHE_MAX_BYTES:
+            return
+        tmp_path = None
+        try:
+            os.makedirs(settings.TEXT_CACHE_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=settings.TEXT_CACHE_DIR, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(body)
+            os.replace(tmp_path, TextCache._path(content_hash))
+            tmp_path = None
+            TextCache._evict(settings.TEXT_CACHE_MAX_BYTES)
+        except OSError as e:
+            logger.warning("Text cache write failed for {}: {!r}", content_hash, e)
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _evict(max_bytes: int) -> None:
+        entries = []
+        with os.scandir(settings.TEXT_CACHE_DIR) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
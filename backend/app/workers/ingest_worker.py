@@ -0,0 +1,174 @@
+"""
+Ingest worker: drains the ingest_jobs table.
+
+    python -m app.workers.ingest_worker
+
+Run as many of these as needed; SKIP LOCKED keeps them from claiming the
+same job. Each serves its metrics at :WORKER_METRICS_PORT/metrics.
+"""
+import asyncio
+import signal
+
+from loguru import logger
+
+from app.api.v1.routes_metrics import METRICS_CONTENT_TYPE
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.executor import start_process_pool, shutdown_process_pool
+from app.core.metrics import render_metrics
+from app.models.ingest_job import IngestJob
+from app.services.dedup_cache import get_dedup_cache
+from app.services.file_service import SpooledUpload
+from app.services.fragment_saver import FragmentSaver
+from app.services.ingest_service import IngestService
+from app.services.job_queue import JobQueue
+
+
+async def _heartbeat(job: IngestJob) -> None:
+    """
+    Extend the job's lease while it is processed, so a long job is not
+    reclaimed by another worker.
+    """
+    while True:
+        await asyncio.sleep(settings.INGEST_HEARTBEAT_SECONDS)
+        try:
+            async with AsyncSessionLocal() as session:
+                if not await JobQueue.heartbeat(session, job):
+                    logger.warning("Lost the lease on ingest job {}", job.id)
+                    return
+        except Exception:
+            logger.exception("Could not extend the lease on ingest job {}", job.id)
+
+
+async def process_job(job: IngestJob) -> None:
+    heartbeat = asyncio.create_task(_heartbeat(job))
+    try:
+        await _run_job(job)
+    finally:
+        heartbeat.cancel()
+
+
+async def _run_job(job: IngestJob) -> None:
+    spooled = SpooledUpload(
+        path=job.payload_path,
+        filename=job.filename,
+        content_type=job.content_type,
+        size_bytes=job.size_bytes,
+        content_hash=job.content_hash,
+    )
+    try:
+        async with AsyncSessionLocal() as session:
+            duplicate = await IngestService.find_duplicate(session, spooled, job.source_id)
+            if duplicate is not None:
+                if not await JobQueue.complete(session, job, duplicate):
+                    raise RuntimeError(f"Lost the lease on ingest job {job.id}")
+                await session.commit()
+        if duplicate is not None:
+            spooled.cleanup()
+            return
+        extraction = await IngestService.extract(spooled)
+        async with AsyncSessionLocal() as session:
+            await JobQueue.mark_extracted(session, job.id)
+        async with AsyncSessionLocal() as session:
+            try:
+                result = await IngestService.persist(
+                    session, spooled, job.source_id, extraction, commit=False
+                )
+                # Fenced on the claim: a worker whose lease lapsed rolls
+                # back instead of recording the job a second time.
+                if not await JobQueue.complete(session, job, result):
+                    raise RuntimeError(f"Lost the lease on ingest job {job.id}")
+            except Exception:
+                await FragmentSaver.remove_uncommitted_records(session)
+                raise
+            await FragmentSaver.commit(session)
+    except Exception as e:
+        logger.exception("Ingest job {} failed on attempt {}", job.id, job.attempts)
+        async with AsyncSessionLocal() as session:
+            final = await JobQueue.fail(session, job, repr(e))
+        if final:
+            spooled.cleanup()
+        return
+    spooled.cleanup()
+
+
+async def _drain(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        async with AsyncSessionLocal() as session:
+            job = await JobQueue.claim(session)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.INGEST_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await process_job(job)
+
+
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Just enough HTTP for a Prometheus scrape: GET /metrics, one request
+    per connection.
+    """
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+        method, target, _ = head.split(b"\r\n", 1)[0].split(b" ", 2)
+        if method == b"GET" and target.split(b"?", 1)[0] == b"/metrics":
+            status, content_type = "200 OK", METRICS_CONTENT_TYPE
+            body = render_metrics().encode()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", b"Not Found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+    except (
+        asyncio.TimeoutError,
+        asyncio.IncompleteReadError,
+        asyncio.LimitOverrunError,
+        ConnectionError,
+        ValueError,
+    ):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_worker(stop: asyncio.Event) -> None:
+    metrics_server = None
+    if settings.METRICS_ENABLED and settings.WORKER_METRICS_PORT:
+        metrics_server = await asyncio.start_server(
+            _serve_metrics, port=settings.WORKER_METRICS_PORT
+        )
+    await start_process_pool()
+    await FragmentSaver.ensure_indexes()
+    dedup_cache = get_dedup_cache()
+    if dedup_cache is not None:
+        async with AsyncSessionLocal() as session:
+            await dedup_cache.rebuild(session)
+    try:
+        await asyncio.gather(
+            *(_drain(stop) for _ in range(max(1, settings.INGEST_WORKER_CONCURRENCY)))
+        )
+    finally:
+        shutdown_process_pool()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+
+
+def main() -> None:
+    async def _main() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await run_worker(stop)
+
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
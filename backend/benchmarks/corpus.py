@@ -0,0 +1,446 @@
+"""
+Seeded synthetic corpus for the benchmarks. The same kind, size and seed
+always produce the same bytes, so runs on different commits read
+identical input. Files are written record by record, so a 1 GB corpus
+does not need 1 GB of memory, and are cached in the corpus directory
+next to a small .meta.json with their record count.
+
+    python -m benchmarks.corpus --kinds json,csv --sizes 1MB,64MB
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, TextIO, Tuple
+
+KINDS = ("json", "ndjson", "csv", "kv", "html", "log", "pdf", "schema")
+DEFAULT_SEED = 1337
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "etl-bench-corpus")
+
+_EXTENSIONS = {
+    "json": "json",
+    "ndjson": "ndjson",
+    "csv": "csv",
+    "kv": "txt",
+    "html": "html",
+    "log": "log",
+    "pdf": "pdf",
+    "schema": "schema.json",
+}
+_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*$", re.IGNORECASE)
+
+_WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima "
+    "mike november oscar papa quebec romeo sierra tango uniform victor whiskey "
+    "xray yankee zulu"
+).split()
+_TYPES = ("string", "integer", "float", "boolean", "date", "datetime", "null")
+_CITIES = ("Berlin", "Lagos", "Lima", "Osaka", "Oslo", "Pune", "Quito", "Seoul", "Austin")
+_LEVELS = ("DEBUG", "INFO", "INFO", "INFO", "WARN", "ERROR")
+_EPOCH = datetime(2024, 1, 1)
+
+# Rows per <table> and lines per PDF page.
+_HTML_TABLE_ROWS = 200
+_PDF_PAGE_LINES = 60
+
+
+def parse_size(value: str) -> int:
+    """
+    "512", "1KB", "64MB", "1GB"; units are binary.
+    """
+    match = _SIZE.match(value)
+    if not match:
+        raise ValueError(f"Invalid size: {value!r}")
+    number, unit = match.groups()
+    unit = unit.upper()
+    if unit and not unit.endswith("B"):
+        unit += "B"
+    return int(float(number) * _UNITS[unit])
+
+
+def format_size(size: int) -> str:
+    for unit in ("GB", "MB", "KB"):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def _record(rng: random.Random, i: int) -> Dict:
+    created = _EPOCH + timedelta(seconds=rng.randrange(365 * 86400))
+    record = {
+        "id": i,
+        "name": f"{rng.choice(_WORDS)} {rng.choice(_WORDS)}",
+        "email": f"user{rng.randrange(10 ** 6)}@example.com",
+        "score": round(rng.uniform(0, 1000), 3),
+        "active": rng.random() < 0.7,
+        "created_at": created.isoformat() + "Z",
+        "tags": rng.sample(_WORDS, rng.randrange(4)),
+        "address": {
+            "city": rng.choice(_CITIES),
+            "zip": f"{rng.randrange(10 ** 5):05d}",
+        },
+    }
+    # Optional and drifting fields, so inference sees nulls, missing keys
+    # and mixed types.
+    if rng.random() < 0.3:
+        record["referrer"] = None
+    if rng.random() < 0.1:
+        record["score"] = str(record["score"])
+    if rng.random() < 0.2:
+        record["items"] = [
+            {"sku": f"SKU-{rng.randrange(10 ** 4)}", "qty": rng.randrange(1, 9)}
+            for _ in range(rng.randrange(1, 4))
+        ]
+    return record
+
+
+def _dumps(record: Dict) -> str:
+    return json.dumps(record, separators=(",", ":"))
+
+
+def _csv_row(rng: random.Random, i: int) -> str:
+    # No colons: extract_csv_blocks treats a line with one as prose.
+    day = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+    return ",".join(
+        (
+            str(i),
+            rng.choice(_WORDS),
+            rng.choice(_CITIES),
+            f"{rng.uniform(0, 1000):.2f}",
+            "true" if rng.random() < 0.7 else "false",
+            day.isoformat(),
+            str(rng.randrange(10 ** 6)),
+        )
+    )
+
+
+_CSV_HEADER = "id,name,city,amount,active,day,account"
+
+
+def _log_line(rng: random.Random, i: int) -> str:
+    at = _EPOCH + timedelta(milliseconds=i * 137 + rng.randrange(100))
+    return (
+        f"{at.isoformat(timespec='milliseconds')}Z {rng.choice(_LEVELS)} "
+        f"[{rng.choice(_WORDS)}] request {rng.randrange(10 ** 8):08x} "
+        f"took {rng.randrange(1, 2000)}ms"
+    )
+
+
+# Each writer yields chunks of output and a record count per chunk; the
+# caller stops pulling once the target size is reached and then appends
+# the writer's footer.
+Chunks = Iterator[Tuple[str, int]]
+
+
+def _json_chunks(rng: random.Random) -> Chunks:
+    i = 0
+    while True:
+        yield ("," if i else "") + _dumps(_record(rng, i)), 1
+        i += 1
+
+
+def _ndjson_chunks(rng: random.Random) -> Chunks:
+    i = 0
+    while True:
+        yield _dumps(_record(rng, i)) + "\n", 1
+        i += 1
+
+
+def _csv_chunks(rng: random.Random) -> Chunks:
+    i = 0
+    while True:
+        yield _csv_row(rng, i) + "\n", 1
+        i += 1
+
+
+def _kv_chunks(rng: random.Random) -> Chunks:
+    i = 0
+    while True:
+        lines = [
+            f"Record {i}",
+            f"customer_id: {rng.randrange(10 ** 6)}",
+            f"name: {rng.choice(_WORDS)} {rng.choice(_WORDS)}",
+            f"city: {rng.choice(_CITIES)}",
+            f"balance: {rng.uniform(-500, 5000):.2f}",
+            f"status: {rng.choice(('open', 'closed', 'pending'))}",
+        ]
+        yield "\n".join(lines) + "\n\n", 1
+        i += 1
+
+
+def _html_chunks(rng: random.Random) -> Chunks:
+    i = 0
+    while True:
+        if i % _HTML_TABLE_ROWS == 0:
+            prefix = "</table>\n" if i else ""
+            yield (
+                prefix
+                + f"<h2>Batch {i // _HTML_TABLE_ROWS}</h2>\n<table>\n"
+                + "<tr><th>id</th><th>name</th><th>city</th><th>amount</th><th>active</th></tr>\n"
+            ), 0
+        yield (
+            f"<tr><td>{i}</td><td>{rng.choice(_WORDS)}</td><td>{rng.choice(_CITIES)}</td>"
+            f"<td>{rng.uniform(0, 1000):.2f}</td><td>{'yes' if rng.random() < 0.5 else 'no'}</td></tr>\n"
+        ), 1
+        i += 1
+
+
+def _log_chunks(rng: random.Random) -> Chunks:
+    """
+    Application log lines with the occasional embedded JSON payload, KV
+    block and short CSV export, the mix an upload of real logs has.
+    """
+    i = 0
+    while True:
+        roll = rng.random()
+        if roll < 0.05:
+            yield "payload " + _dumps(_record(rng, i)) + "\n", 1
+        elif roll < 0.08:
+            yield (
+                f"order_id: {rng.randrange(10 ** 6)}\n"
+                f"customer: {rng.choice(_WORDS)}\n"
+                f"total: {rng.uniform(0, 900):.2f}\n"
+            ), 3
+        elif roll < 0.09:
+            rows = rng.randrange(3, 12)
+            lines = [_CSV_HEADER] + [_csv_row(rng, i + n) for n in range(rows)]
+            yield "\n".join(lines) + "\n", rows
+        else:
+            yield _log_line(rng, i) + "\n", 1
+        i += 1
+
+
+def _header_footer(kind: str) -> Tuple[str, str]:
+    if kind == "json":
+        return "[", "]\n"
+    if kind == "csv":
+        return _CSV_HEADER + "\n", ""
+    if kind == "html":
+        return "<html><body>\n", "</table>\n</body></html>\n"
+    return "", ""
+
+
+_TEXT_WRITERS: Dict[str, Callable[[random.Random], Chunks]] = {
+    "json": _json_chunks,
+    "ndjson": _ndjson_chunks,
+    "csv": _csv_chunks,
+    "kv": _kv_chunks,
+    "html": _html_chunks,
+    "log": _log_chunks,
+}
+
+
+def _write_text(fh: TextIO, kind: str, size: int, rng: random.Random) -> int:
+    header, footer = _header_footer(kind)
+    fh.write(header)
+    written = len(header) + len(footer)
+    records = 0
+    for chunk, count in _TEXT_WRITERS[kind](rng):
+        # Always emit at least one record, even below the chunk size.
+        if records and written + len(chunk) > size:
+            break
+        fh.write(chunk)
+        written += len(chunk)
+        records += count
+    fh.write(footer)
+    return records
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _write_pdf(fh, size: int, rng: random.Random) -> int:
+    """
+    A minimal PDF of log-line pages in Helvetica, written object by
+    object with a correct xref table, so no PDF library is needed.
+    Objects 1-3 are the catalog, page tree and font; each page adds a
+    page and a content stream object.
+    """
+    offsets: Dict[int, int] = {}
+    position = 0
+
+    def emit(data: bytes) -> None:
+        nonlocal position
+        fh.write(data)
+        position += len(data)
+
+    def emit_object(number: int, body: bytes) -> None:
+        offsets[number] = position
+        emit(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    emit_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    emit_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    pages: List[int] = []
+    records = 0
+    lines = (_log_line(rng, i) for i in itertools.count())
+    # Trailer and xref cost roughly 40 bytes per page.
+    while not pages or position + 40 * len(pages) < size:
+        ops = ["BT", "/F1 8 Tf", "10 TL", "36 780 Td"]
+        for _ in range(_PDF_PAGE_LINES):
+            ops.append(f"({_pdf_escape(next(lines))}) '")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        records += _PDF_PAGE_LINES
+
+        page = 4 + 2 * len(pages)
+        pages.append(page)
+        emit_object(
+            page,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page + 1),
+        )
+        emit_object(
+            page + 1,
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        )
+
+    kids = b" ".join(b"%d 0 R" % page for page in pages)
+    emit_object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(pages))
+
+    count = max(offsets) + 1
+    xref = position
+    emit(b"xref\n0 %d\n0000000000 65535 f \n" % count)
+    for number in range(1, count):
+        emit(b"%010d 00000 n \n" % offsets[number])
+    emit(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref))
+    return records
+
+
+def _schema_node(rng: random.Random, depth: int) -> Tuple[Dict, int]:
+    """
+    A schema node shaped like finalize_schema output, without hashes, and
+    the number of paths in it.
+    """
+    node: Dict = {
+        "types": sorted(rng.sample(_TYPES, rng.choice((1, 1, 1, 2)))),
+        "null_ratio": round(rng.random() * 0.3, 4),
+    }
+    paths = 1
+    roll = rng.random()
+    if depth < 4 and roll < 0.25:
+        node["types"] = ["object"]
+        node["fields"] = {}
+        for n in range(rng.randrange(2, 9)):
+            child, count = _schema_node(rng, depth + 1)
+            node["fields"][f"{rng.choice(_WORDS)}_{n}"] = child
+            paths += count
+    elif depth < 4 and roll < 0.35:
+        node["types"] = ["array"]
+        node["items"], count = _schema_node(rng, depth + 1)
+        paths += count
+    return node, paths
+
+
+def _mutate(rng: random.Random, fields: Dict, rate: float) -> None:
+    """
+    Drift a field map in place: retype, drop or add about `rate` of the
+    fields at every level.
+    """
+    for key in list(fields):
+        roll = rng.random()
+        if roll < rate / 3:
+            fields[key]["types"] = sorted(set(fields[key]["types"]) | {rng.choice(_TYPES)})
+        elif roll < 2 * rate / 3:
+            del fields[key]
+            continue
+        elif roll < rate:
+            fields[f"{key}_new"] = _schema_node(rng, 3)[0]
+        node = fields[key]
+        if "fields" in node:
+            _mutate(rng, node["fields"], rate)
+        if "items" in node and "fields" in node["items"]:
+            _mutate(rng, node["items"]["fields"], rate)
+
+
+def _write_schema(fh: TextIO, size: int, rng: random.Random) -> int:
+    """
+    An old and a drifted new schema of about size / 2 bytes each, as
+    {"old": ..., "new": ...}. Built in memory: schemas are parsed whole.
+    """
+    old: Dict = {}
+    paths = 0
+    written = 0
+    while not old or written < size // 2:
+        node, count = _schema_node(rng, 0)
+        key = f"{rng.choice(_WORDS)}_{len(old)}"
+        old[key] = node
+        paths += count
+        written += len(_dumps(node)) + len(key) + 4
+    new = json.loads(_dumps(old))
+    _mutate(rng, new, 0.02)
+    fh.write(_dumps({"old": old, "new": new}))
+    return paths
+
+
+def corpus_path(kind: str, size: int, seed: int, corpus_dir: str) -> str:
+    return os.path.join(corpus_dir, f"{kind}-{format_size(size)}-{seed}.{_EXTENSIONS[kind]}")
+
+
+def generate(
+    kind: str,
+    size: int,
+    seed: int = DEFAULT_SEED,
+    corpus_dir: str = DEFAULT_CORPUS_DIR,
+) -> Tuple[str, Dict]:
+    """
+    Path and metadata ({"kind", "size_bytes", "records", "seed"}) of the
+    corpus file, generating it on first use.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown corpus kind: {kind!r}")
+    path = corpus_path(kind, size, seed, corpus_dir)
+    meta_path = path + ".meta.json"
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as fh:
+            return path, json.load(fh)
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    # Seeded per kind too, so two kinds of one seed do not share values.
+    rng = random.Random(f"{seed}:{kind}")
+    partial = path + ".partial"
+    if kind == "pdf":
+        with open(partial, "wb") as fh:
+            records = _write_pdf(fh, size, rng)
+    elif kind == "schema":
+        with open(partial, "w", encoding="utf-8") as fh:
+            records = _write_schema(fh, size, rng)
+    else:
+        with open(partial, "w", encoding="utf-8", newline="") as fh:
+            records = _write_text(fh, kind, size, rng)
+    os.replace(partial, path)
+
+    meta = {
+        "kind": kind,
+        "size_bytes": os.path.getsize(path),
+        "records": records,
+        "seed": seed,
+    }
+    with open(meta_path, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    return path, meta
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate the benchmark corpus.")
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--sizes", default="1KB,1MB")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    args = parser.parse_args()
+
+    for kind in args.kinds.split(","):
+        for size in args.sizes.split(","):
+            path, meta = generate(kind.strip(), parse_size(size), args.seed, args.corpus_dir)
+            print(f"{path}  {meta['size_bytes']} bytes  {meta['records']} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Microbenchmarks for the extraction, inference and diff hot paths, over
+the seeded corpus from benchmarks.corpus. Run from the backend directory:
+
+    python -m benchmarks.run --sizes 1KB,1MB,64MB --save-baseline baseline.json
+    python -m benchmarks.run --sizes 1KB,1MB,64MB --baseline baseline.json
+
+Every case runs in a fresh process, so its peak RSS is its own. A case
+reports the median time per pass over its input as MB/s and as corpus
+records/s (schema paths/s for the diff); short inputs are repeated
+within a pass until it lasts --min-time.
+Against a baseline, a case fails when its MB/s drops by more than
+--threshold or its RSS grows by more than --rss-threshold, and the run
+exits 1. RSS is checked both as the peak reached while running, over
+what loading the input took, and as the process peak. Baselines are machine specific: record them on the machine
+that compares against them.
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.services.csv_stream import iter_csv_blocks, sniff_dialect
+from app.services.extraction_jobs import extract_fragments
+from app.services.file_service import FileService, SpooledUpload
+from app.services.fragment_extractor import FragmentExtractor
+from app.services.json_stream import iter_json_array, iter_ndjson
+from app.services.schema_diff import SchemaDiffService
+from app.services.schema_inference import SchemaInferenceService
+from benchmarks.corpus import (
+    DEFAULT_CORPUS_DIR,
+    DEFAULT_SEED,
+    KINDS,
+    format_size,
+    generate,
+    parse_size,
+)
+
+_CONTENT_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "pdf": "application/pdf",
+}
+
+
+class Component(NamedTuple):
+    kinds: Tuple[str, ...]
+    # path -> input, prepared before timing starts
+    load: Callable[[str], Any]
+    # The timed call on that input
+    run: Callable[[Any], Any]
+
+
+def _load_text(path: str) -> str:
+    with open(path, encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _load_records(path: str) -> List[dict]:
+    with open(path, "rb") as fh:
+        if path.endswith(".ndjson"):
+            return [orjson.loads(line) for line in fh if line.strip()]
+        return orjson.loads(fh.read())
+
+
+def _load_spooled(path: str) -> SpooledUpload:
+    kind = os.path.basename(path).split("-", 1)[0]
+    return SpooledUpload(
+        path, os.path.basename(path), _CONTENT_TYPES.get(kind), os.path.getsize(path), ""
+    )
+
+
+def _load_schemas(path: str) -> Tuple[str, str]:
+    """
+    The old and new schema as stored: serialized, with subtree hashes.
+    """
+    with open(path, "rb") as fh:
+        pair = orjson.loads(fh.read())
+    for schema in (pair["old"], pair["new"]):
+        for node in schema.values():
+            SchemaDiffService.ensure_hash(node)
+    return orjson.dumps(pair["old"]).decode(), orjson.dumps(pair["new"]).decode()
+
+
+def _stream_json(spooled: SpooledUpload) -> None:
+    with spooled.open() as fh:
+        parse = iter_ndjson if spooled.path.endswith(".ndjson") else iter_json_array
+        for _ in parse(fh):
+            pass
+
+
+def _stream_csv(spooled: SpooledUpload) -> None:
+    dialect = sniff_dialect(spooled)
+    with spooled.open() as fh:
+        for _ in iter_csv_blocks(fh, dialect, settings.CSV_STREAM_ROWS_PER_FRAGMENT):
+            pass
+
+
+def _infer_batches(records: List[dict]) -> None:
+    stats: Dict[str, Any] = {}
+    size = settings.JSON_STREAM_RECORDS_PER_FRAGMENT
+    for start in range(0, len(records), size):
+        SchemaInferenceService.merge_field_stats(
+            stats, SchemaInferenceService.infer_batch(records[start:start + size])
+        )
+
+
+def _merge_each(records: List[dict]) -> None:
+    stats: Dict[str, Any] = {}
+    for record in records:
+        SchemaInferenceService.merge_field_types(stats, record)
+
+
+def _diff(pair: Tuple[str, str]) -> None:
+    SchemaDiffService.diff(*pair)
+
+
+COMPONENTS: Dict[str, Component] = {
+    "extractor.json_blocks": Component(
+        ("json", "ndjson", "log"), _load_text, FragmentExtractor.extract_json_blocks
+    ),
+    "extractor.csv_blocks": Component(
+        ("csv", "log"), _load_text, FragmentExtractor.extract_csv_blocks
+    ),
+    "extractor.kv_blocks": Component(("kv", "log"), _load_text, FragmentExtractor.extract_kv_blocks),
+    "extractor.html_tables": Component(("html",), _load_text, FragmentExtractor.extract_html_tables),
+    "extractor.text_block": Component(("log",), _load_text, FragmentExtractor.extract_text_block),
+    "extract_fragments": Component(
+        ("json", "csv", "kv", "html", "log"), _load_text, extract_fragments
+    ),
+    "stream.json": Component(("json", "ndjson"), _load_spooled, _stream_json),
+    "stream.csv": Component(("csv",), _load_spooled, _stream_csv),
+    "inference.infer_batch": Component(("json", "ndjson"), _load_records, _infer_batches),
+    "inference.merge_field_types": Component(("json", "ndjson"), _load_records, _merge_each),
+    "diff.diff": Component(("schema",), _load_schemas, _diff),
+    "pdf.read_text": Component(("pdf",), _load_spooled, FileService.read_text),
+}
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def case_key(component: str, kind: str, size: int) -> str:
+    return f"{component}/{kind}/{format_size(size)}"
+
+
+def measure(
+    component: str,
+    kind: str,
+    size: int,
+    seed: int,
+    corpus_dir: str,
+    repeat: int,
+    min_time: float,
+) -> Dict[str, Any]:
+    """
+    Run one case. Meant to be called in a fresh process.
+    """
+    spec = COMPONENTS[component]
+    path, meta = generate(kind, size, seed, corpus_dir)
+    payload = spec.load(path)
+    loaded_rss = _peak_rss_mb()
+
+    started = time.perf_counter()
+    spec.run(payload)
+    first = time.perf_counter() - started
+    loops = max(1, math.ceil(min_time / first)) if first > 0 else 1
+
+    passes = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            spec.run(payload)
+        passes.append((time.perf_counter() - started) / loops)
+    seconds = statistics.median(passes)
+
+    records = meta["records"]
+    peak_rss = _peak_rss_mb()
+    return {
+        "component": component,
+        "kind": kind,
+        "size": format_size(size),
+        "input_bytes": meta["size_bytes"],
+        "records": records,
+        "loops": loops,
+        "seconds": seconds,
+        "mb_per_s": meta["size_bytes"] / (1024 * 1024) / seconds,
+        "records_per_s": records / seconds,
+        "peak_rss_mb": peak_rss,
+        # Peak reached while running, over what loading the input took.
+        "run_rss_mb": max(0.0, peak_rss - loaded_rss),
+    }
+
+
+# Growth under this is allocator and page granularity noise, which a
+# percentage alone would flag on cases that barely allocate.
+RSS_SLACK_MB = 1.0
+
+
+def run_case(*args: Any) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure, *args).result()
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float,
+    rss_threshold: float,
+) -> Dict[str, List[str]]:
+    """
+    Regressions per case key, as human-readable reasons.
+    """
+    regressions: Dict[str, List[str]] = {}
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        reasons = []
+        floor = base["mb_per_s"] * (1 - threshold)
+        if result["mb_per_s"] < floor:
+            reasons.append(
+                f"throughput {result['mb_per_s']:.2f} MB/s < {base['mb_per_s']:.2f} MB/s"
+                f" - {threshold:.0%}"
+            )
+        # Peak RSS includes the interpreter, the imports and the loaded
+        # input, which would hide a component's own growth; gate on both.
+        for field, label in (("run_rss_mb", "run RSS"), ("peak_rss_mb", "peak RSS")):
+            if field not in base:
+                continue
+            ceiling = base[field] * (1 + rss_threshold) + RSS_SLACK_MB
+            if result[field] > ceiling:
+                reasons.append(
+                    f"{label} {result[field]:.1f} MB > {base[field]:.1f} MB"
+                    f" + {rss_threshold:.0%}"
+                )
+        if reasons:
+            regressions[key] = reasons
+    return regressions
+
+
+def _print_row(key: str, result: Dict[str, Any], baseline: Dict[str, Dict[str, Any]]) -> None:
+    change = ""
+    if baseline:
+        base = baseline.get(key)
+        change = "new" if base is None else f"{result['mb_per_s'] / base['mb_per_s'] - 1:+.1%}"
+    print(
+        f"{key:<52} {result['mb_per_s']:>10.2f} {result['records_per_s']:>13.0f}"
+        f" {result['peak_rss_mb']:>9.1f} {result['run_rss_mb']:>8.1f}  {change}",
+        flush=True,
+    )
+
+
+def _csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark extractors, inference and diff.")
+    parser.add_argument("--components", default=",".join(COMPONENTS))
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--sizes", default="1KB,1MB")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Seconds each pass runs for at least, looping short inputs.")
+    parser.add_argument("--baseline", help="Compare against this baseline file.")
+    parser.add_argument("--save-baseline", help="Write the results to this baseline file.")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed fractional drop in MB/s.")
+    parser.add_argument("--rss-threshold", type=float, default=0.25,
+                        help="Allowed fractional growth in run and peak RSS.")
+    args = parser.parse_args(argv)
+
+    components = _csv(args.components)
+    kinds = _csv(args.kinds)
+    sizes = [parse_size(size) for size in _csv(args.sizes)]
+    for name in components:
+        if name not in COMPONENTS:
+            parser.error(f"unknown component {name!r}; choose from {', '.join(COMPONENTS)}")
+    for kind in kinds:
+        if kind not in KINDS:
+            parser.error(f"unknown kind {kind!r}; choose from {', '.join(KINDS)}")
+
+    baseline: Dict[str, Dict[str, Any]] = {}
+    if args.baseline:
+        with open(args.baseline, "rb") as fh:
+            baseline = orjson.loads(fh.read())["results"]
+
+    cases = [
+        (component, kind, size)
+        for component in components
+        for kind in COMPONENTS[component].kinds
+        if kind in kinds
+        for size in sizes
+    ]
+    # Generated up front, so no case pays for writing its corpus.
+    for kind, size in sorted({(kind, size) for _, kind, size in cases}):
+        generate(kind, size, args.seed, args.corpus_dir)
+
+    print(
+        f"{'case':<52} {'MB/s':>10} {'records/s':>13} {'peak MB':>9} {'run MB':>8}  change",
+        flush=True,
+    )
+    results: Dict[str, Dict[str, Any]] = {}
+    for component, kind, size in cases:
+        key = case_key(component, kind, size)
+        results[key] = run_case(
+            component, kind, size, args.seed, args.corpus_dir, args.repeat, args.min_time
+        )
+        _print_row(key, results[key], baseline)
+
+    if args.save_baseline:
+        document = {
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "results": results,
+        }
+        with open(args.save_baseline, "wb") as fh:
+            fh.write(orjson.dumps(document, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if not baseline:
+        return 0
+    regressions = compare(results, baseline, args.threshold, args.rss_threshold)
+    if not regressions:
+        print(f"\nNo regressions against {args.baseline}")
+        return 0
+    print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+    for key, reasons in regressions.items():
+        for reason in reasons:
+            print(f"  {key}: {reason}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
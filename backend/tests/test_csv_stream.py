@@ -0,0 +1,64 @@
+import csv
+import io
+
+import pytest
+
+from app.services.csv_stream import EXTRA_FIELDS_KEY, iter_csv_blocks
+
+DATA = (
+    b'\xef\xbb\xbfid,note,city\r\n'
+    b'1,"two\nlines",Oslo\r\n'
+    b'\r\n'
+    b'2,"quote "" and, comma",Bergen\r\n'
+    b'3,short\r\n'
+    b'4,"x",Troms\xc3\xb8,extra\r\n'
+    b'5,"ends\nin a newline\n",Bod\xc3\xb8'
+)
+ROWS = [
+    {"id": "1", "note": "two\nlines", "city": "Oslo"},
+    {"id": "2", "note": 'quote " and, comma', "city": "Bergen"},
+    {"id": "3", "note": "short", "city": None},
+    {"id": "4", "note": "x", "city": "Tromsø", EXTRA_FIELDS_KEY: ["extra"]},
+    {"id": "5", "note": "ends\nin a newline\n", "city": "Bodø"},
+]
+
+
+def _blocks(data: bytes, rows_per_fragment: int):
+    return list(iter_csv_blocks(io.BytesIO(data), csv.excel, rows_per_fragment))
+
+
+@pytest.mark.parametrize("rows_per_fragment", range(1, len(ROWS) + 2))
+def test_blocks_cover_every_row_once(rows_per_fragment):
+    blocks = _blocks(DATA, rows_per_fragment)
+    assert [row for block in blocks for row in block["rows"]] == ROWS
+    assert [(b["start_row"], b["end_row"]) for b in blocks] == [
+        (start, min(start + rows_per_fragment, len(ROWS)))
+        for start in range(0, len(ROWS), rows_per_fragment)
+    ]
+
+
+@pytest.mark.parametrize("rows_per_fragment", range(1, len(ROWS) + 2))
+def test_block_offsets_reparse_to_the_block_rows(rows_per_fragment):
+    blocks = _blocks(DATA, rows_per_fragment)
+    assert blocks[0]["start_offset"] == DATA.index(b"1,")
+    assert blocks[-1]["end_offset"] == len(DATA)
+    for block, following in zip(blocks, blocks[1:]):
+        # Blank lines between blocks belong to neither.
+        assert block["end_offset"] <= following["start_offset"]
+    header = b"id,note,city\r\n"
+    for block in blocks:
+        body = header + DATA[block["start_offset"]:block["end_offset"]]
+        assert _blocks(body, len(ROWS))[0]["rows"] == block["rows"]
+
+
+def test_quoted_cell_larger_than_the_default_field_limit():
+    cell = "x" * 300_000 + "\n" + "y" * 300_000
+    data = b'a,b\n1,"' + cell.encode() + b'"\n2,3\n'
+    [block] = _blocks(data, 10)
+    assert block["rows"] == [{"a": "1", "b": cell}, {"a": "2", "b": "3"}]
+    assert block["end_offset"] == len(data)
+
+
+@pytest.mark.parametrize("data", [b"", b"\r\n\r\n", b"a,b\r\n"])
+def test_no_data_rows(data):
+    assert _blocks(data, 2) == []
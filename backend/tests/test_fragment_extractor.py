@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from app.services.fragment_extractor import FragmentExtractor, _scan_json_spans
+
+
+def _both(text: str):
+    """
+    The same input as str and as bytes; ASCII, so offsets agree.
+    """
+    return [text, text.encode()]
+
+
+@pytest.mark.parametrize("text", _both('a {"x": [1, {"y": 2}]} b [3]'))
+def test_scan_returns_nested_spans_outer_first(text):
+    assert _scan_json_spans(text) == [(2, 22), (8, 21), (12, 20), (25, 28)]
+
+
+@pytest.mark.parametrize("text", _both('{"s": "}]{[", "t": "\\"}"}'))
+def test_scan_ignores_brackets_and_escaped_quotes_in_strings(text):
+    assert _scan_json_spans(text) == [(0, len(text))]
+
+
+@pytest.mark.parametrize("text", _both('it\'s a "quote {"a": 1}'))
+def test_scan_treats_quotes_outside_candidates_as_prose(text):
+    start = text.index(b"{" if isinstance(text, bytes) else "{")
+    assert _scan_json_spans(text) == [(start, len(text))]
+
+
+@pytest.mark.parametrize("text", _both('{ [ {"a": 1} }'))
+def test_scan_drops_unmatched_openers(text):
+    assert _scan_json_spans(text) == [(0, 14), (4, 12)]
+
+
+@pytest.mark.parametrize("text", _both('x {"a": 1} [{"b": 2}, 3, {"c": 4}] {bad {"d": 5}'))
+def test_extract_json_blocks(text):
+    blocks = FragmentExtractor.extract_json_blocks(text)
+    assert [(b["start_offset"], b["end_offset"]) for b in blocks] == [(2, 10), (11, 34), (40, 48)]
+    assert [b["records"] for b in blocks] == [[{"a": 1}], [{"b": 2}, {"c": 4}], [{"d": 5}]]
+    assert [b["record_count"] for b in blocks] == [1, 2, 1]
+
+
+def test_extract_json_blocks_offsets_index_into_input():
+    text = 'héllo {"k": "välue"}'
+    [block] = FragmentExtractor.extract_json_blocks(text)
+    assert text[block["start_offset"]:block["end_offset"]] == '{"k": "välue"}'
+
+    data = text.encode()
+    [block] = FragmentExtractor.extract_json_blocks(data)
+    assert data[block["start_offset"]:block["end_offset"]] == '{"k": "välue"}'.encode()
+
+
+def test_parsed_span_without_objects_covers_its_children():
+    # The outer array parsed, so the spans inside it are not tried on
+    # their own; it holds no objects at its top level.
+    assert FragmentExtractor.extract_json_blocks('[[1, 2], [{"a": 1}], 3]') == []
+    assert FragmentExtractor.extract_json_blocks("[[[1]], [[2]]]") == []
+
+
+def test_deep_nesting_is_not_quadratic():
+    text = "[" * 5000 + "]" * 5000
+    started = time.perf_counter()
+    assert FragmentExtractor.extract_json_blocks(text) == []
+    assert time.perf_counter() - started < 1.0
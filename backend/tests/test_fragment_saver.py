@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import fragment_saver
+from app.services.fragment_saver import RECORD_META_KEY, _insert_records
+
+
+class _Collection:
+    """
+    insert_many that fails for the batch holding record 0 and is slow
+    for the others, so they are still running when it fails.
+    """
+
+    def __init__(self) -> None:
+        self.inserted = []
+        self.running = 0
+
+    def with_options(self, **_):
+        return self
+
+    async def insert_many(self, batch, ordered):
+        self.running += 1
+        try:
+            if batch[0]["n"] == 0:
+                raise RuntimeError("insert failed")
+            await asyncio.sleep(0.05)
+            self.inserted.extend(batch)
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    coll = _Collection()
+    monkeypatch.setattr(fragment_saver, "get_mongo_db", lambda: {"json_fragments": coll})
+    monkeypatch.setattr(settings, "MONGO_INSERT_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "MONGO_INSERT_CONCURRENCY", 3)
+    return coll
+
+
+def _insert(records):
+    session = SimpleNamespace(info={})
+    fragments = [("frag", [{"n": n} for n in records])]
+    asyncio.run(_insert_records(session, "json", fragments, "file", "src"))
+    return session
+
+
+def test_inserts_every_record_tagged(collection):
+    session = _insert(range(1, 8))
+    assert sorted(doc["n"] for doc in collection.inserted) == list(range(1, 8))
+    assert {doc[RECORD_META_KEY]["file_id"] for doc in collection.inserted} == {"file"}
+    assert session.info[fragment_saver._UNCOMMITTED_KEY] == {"file"}
+
+
+def test_failure_waits_for_batches_in_flight(collection):
+    with pytest.raises(RuntimeError, match="insert failed"):
+        _insert(range(0, 20))
+    # Nothing is still writing once the error reaches the caller, and no
+    # batch is started after the failure.
+    assert collection.running == 0
+    assert sorted(doc["n"] for doc in collection.inserted) == [2, 3, 4, 5]
@@ -0,0 +1,72 @@
+import io
+
+import orjson
+import pytest
+
+from app.services.json_stream import iter_json_array, iter_ndjson
+
+CHUNK_SIZES = [1, 2, 3, 5, 8, 13, 64, 1024 * 1024]
+
+ARRAY = (
+    b'\xef\xbb\xbf  [{"a": 1}, 2, "s}, {", {"b": {"c": [1, {"d": "}]"}]}},'
+    b' [{"skip": 1}], {"e": "esc \\" },"},\n {"bad": }, {"f": "\xc3\xa9"}] trailing'
+)
+EXPECTED = [
+    {"a": 1},
+    {"b": {"c": [1, {"d": "}]"}]}},
+    {"e": 'esc " },'},
+    {"f": "é"},
+]
+
+
+def _array(data: bytes, chunk_size: int):
+    return list(iter_json_array(io.BytesIO(data), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_array_records_and_spans(chunk_size):
+    records = _array(ARRAY, chunk_size)
+    assert [r for _, _, r in records] == EXPECTED
+    for start, end, record in records:
+        assert orjson.loads(ARRAY[start:end]) == record
+
+
+def test_array_spans_do_not_depend_on_chunk_size():
+    expected = _array(ARRAY, 1024 * 1024)
+    for chunk_size in range(1, len(ARRAY) + 2):
+        assert _array(ARRAY, chunk_size) == expected
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_array_unterminated_string_is_not_a_string(chunk_size):
+    # The quote never closes on its line, so the brackets after it count.
+    data = b'["open\n, {"a": 1}]'
+    assert [r for _, _, r in _array(data, chunk_size)] == [{"a": 1}]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_array_stops_at_its_end(chunk_size):
+    data = b'[{"a": 1}] {"b": 2}'
+    assert [r for _, _, r in _array(data, chunk_size)] == [{"a": 1}]
+
+
+@pytest.mark.parametrize("data", [b"", b"   ", b'{"a": 1}', b"[", b"[]"])
+def test_array_without_elements(data):
+    assert _array(data, 4) == []
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64 * 1024])
+def test_array_long_string_element(chunk_size):
+    value = "x" * 200_000 + '\\"'
+    data = b'[{"s": "' + value.encode() + b'"}, {"t": 1}]'
+    records = _array(data, chunk_size)
+    assert [r for _, _, r in records] == [{"s": value.replace('\\"', '"')}, {"t": 1}]
+    assert records[0][0] == 1
+
+
+def test_ndjson_records_and_offsets():
+    data = b'{"a": 1}\n\n  {"b": 2}  \r\nnot json\n[1]\n{"c": "\xc3\xa9"}'
+    records = list(iter_ndjson(io.BytesIO(data)))
+    assert [r for _, _, r in records] == [{"a": 1}, {"b": 2}, {"c": "é"}]
+    for start, end, record in records:
+        assert orjson.loads(data[start:end]) == record
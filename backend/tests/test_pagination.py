@@ -0,0 +1,45 @@
+import datetime
+
+import pytest
+
+from app.services.pagination import decode_cursor, decode_timestamp, encode_cursor
+
+CREATED_AT = datetime.datetime(2026, 10, 18, 12, 30, 5, 123456, tzinfo=datetime.timezone.utc)
+
+
+def test_round_trip_with_timestamp():
+    cursor = encode_cursor([CREATED_AT, "3f2c-id"])
+    created_at, row_id = decode_cursor(cursor, 2)
+    assert decode_timestamp(created_at) == CREATED_AT
+    assert decode_timestamp(created_at).utcoffset() == datetime.timedelta(0)
+    assert row_id == "3f2c-id"
+
+
+def test_timestamp_keeps_its_offset():
+    local = CREATED_AT.astimezone(datetime.timezone(datetime.timedelta(hours=-5, minutes=-30)))
+    [value] = decode_cursor(encode_cursor([local]), 1)
+    assert decode_timestamp(value) == local
+    assert decode_timestamp(value).utcoffset() == local.utcoffset()
+
+
+@pytest.mark.parametrize("values", [[], [0], ["a", 1, None], ["ü/+?=", 2**40]])
+def test_round_trip(values):
+    cursor = encode_cursor(values)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor, len(values)) == values
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["", "not a cursor!", "e30", encode_cursor(["a"]), encode_cursor(["a", "b", "c"])],
+)
+def test_invalid_cursor(cursor):
+    # "e30" is {} encoded: valid JSON, but not a list.
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+@pytest.mark.parametrize("value", [None, 17, ["2026-10-18"], "yesterday"])
+def test_invalid_timestamp(value):
+    with pytest.raises(ValueError):
+        decode_timestamp(value)
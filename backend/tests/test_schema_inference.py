@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import schema_inference
+from app.services.column_inference import infer_columns
+from app.services.fragment_saver import RECORD_META_KEY
+from app.services.schema_inference import SCAN_MODES, SchemaInferenceService
+
+CORPUS = [
+    {"id": 1, "user": {"name": "a", "tags": ["x", "y"]}, "items": [{"sku": "s1", "qty": 2}]},
+    {"id": "2", "user": {"name": None, "address": {"city": "Oslo"}}, "items": []},
+    {"id": 3, "user": {"name": "c", "tags": [1]}, "items": [{"sku": "s2", "price": 1.5}, 7]},
+    {"id": 4, "user": None, "odd.key": {"a b": True}, "items": [[1, "2"]]},
+    {"id": 5, "user": {"name": "e", "address": {"city": "Bergen", "zip": "5003"}}},
+]
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        pass
+
+
+class _Collection:
+    """
+    Yields the whole corpus, tagged as stored, whatever the stages. The
+    sampling modes then all see every record.
+    """
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def aggregate(self, stages, **_):
+        return _Cursor(
+            [
+                dict(doc, _id=i, **{RECORD_META_KEY: {"file_id": "f", "source_id": "s"}})
+                for i, doc in enumerate(self.docs)
+            ]
+        )
+
+
+@pytest.fixture
+def records(monkeypatch):
+    def use(docs):
+        async def fragment_types(session, source_id):
+            return ["json"]
+
+        monkeypatch.setattr(
+            schema_inference, "get_mongo_db", lambda: {"json_fragments": _Collection(docs)}
+        )
+        monkeypatch.setattr(SchemaInferenceService, "_fragment_types", fragment_types)
+
+    return use
+
+
+def _sample(mode, **kwargs):
+    return asyncio.run(SchemaInferenceService.sample_source(None, "s", mode, **kwargs))
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 1000])
+def test_every_mode_matches_the_upload_path(records, monkeypatch, batch_size):
+    records(CORPUS)
+    monkeypatch.setattr(settings, "SCHEMA_SCAN_BATCH_SIZE", batch_size)
+    incremental = infer_columns(CORPUS)
+    assert "user.address.city" in incremental and "items[].sku" in incremental
+
+    for mode in SCAN_MODES:
+        fields, examined = _sample(
+            mode, budget=len(CORPUS), per_file=len(CORPUS), patience=len(CORPUS)
+        )
+        assert examined == len(CORPUS), mode
+        assert fields == incremental, mode
+        assert SchemaInferenceService.finalize_schema(
+            fields
+        ) == SchemaInferenceService.finalize_schema(incremental), mode
+
+
+def test_convergence_counts_nested_novelty(records):
+    records(
+        [
+            {"a": {"b": 1}},
+            {"a": {"b": 2, "c": "x"}},
+            {"a": {"b": 3}},
+            {"a": {"b": [1]}},
+            {"a": {"b": 4}},
+            {"a": {"b": 5}},
+            {"a": {"d": 1}},
+        ]
+    )
+    fields, examined = _sample("convergence", patience=2)
+    # A new nested field or type resets the count, so the scan reaches the
+    # list under a.b, and stops two records after it.
+    assert examined == 6
+    assert {"a.c", "a.b[]"} <= fields.keys()
+    assert fields["a.b"]["types"] == {"integer": 5, "array": 1}
+    assert "a.d" not in fields